@@ -0,0 +1,215 @@
+"""
+Archive Fetcher
+Pulls an account's full tweet history page by page into sinks (JSONL file,
+tweet store) with constant memory and resumable cursors
+"""
+import json
+import re
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import urllib3
+from twitter_client import TwitterAPIClient, TwitterAPIError
+from tweet_store import TweetStore
+from rate_limit import try_lock_file, unlock_file
+
+# Disable SSL warnings
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+ARCHIVE_DIR = Path(__file__).parent.parent / 'exports' / 'archive'
+
+# Twitter/X usernames - also keeps archive file names inside ARCHIVE_DIR
+USERNAME_PATTERN = re.compile(r'^[A-Za-z0-9_]{1,15}$')
+
+
+class ArchiveInProgress(Exception):
+    """Another run (thread or process) is already archiving the account"""
+
+
+def valid_username(username: str) -> bool:
+    return bool(USERNAME_PATTERN.match(username or ''))
+
+
+def _archive_path(username: str, suffix: str) -> Path:
+    if not valid_username(username):
+        raise ValueError(f"Invalid username: {username!r}")
+    # Usernames are case-insensitive - one set of files per account
+    return ARCHIVE_DIR / f"{username.lower()}{suffix}"
+
+
+@contextmanager
+def _account_lock(username: str):
+    """Exclusive lock on an account's archive files, across threads and processes"""
+    path = _archive_path(username, '.lock')
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a+') as f:
+        if not try_lock_file(f):
+            raise ArchiveInProgress(f"@{username} is already being archived")
+        try:
+            yield
+        finally:
+            unlock_file(f)
+
+
+class JsonlSink:
+    """Appends tweets to a JSON Lines file (one tweet per line)"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def reset(self):
+        """Empty the file before an archive starts from the first page"""
+        open(self.path, 'w', encoding='utf-8').close()
+
+    def write(self, username: str, tweets: List[Dict]):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for tweet in tweets:
+                f.write(json.dumps(tweet, ensure_ascii=False) + '\n')
+
+
+class StoreSink:
+    """Indexes tweets in the TweetStore (search + daily rollups)"""
+
+    def __init__(self, store: Optional[TweetStore] = None):
+        self.store = store or TweetStore()
+
+    def write(self, username: str, tweets: List[Dict]):
+        self.store.add_tweets(username, tweets)
+
+
+def checkpoint_path(username: str) -> Path:
+    return _archive_path(username, '.checkpoint.json')
+
+
+def jsonl_path(username: str) -> Path:
+    return _archive_path(username, '.jsonl')
+
+
+def load_checkpoint(username: str) -> Dict:
+    path = checkpoint_path(username)
+    if path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {'username': username, 'cursor': None, 'fetched': 0, 'done': False}
+
+
+def _save_checkpoint(checkpoint: Dict):
+    path = checkpoint_path(checkpoint['username'])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, indent=2)
+    tmp_path.replace(path)
+
+
+def archive_account(username: str, max_tweets: Optional[int] = None, sinks: Optional[list] = None,
+                    resume: bool = True, client: Optional[TwitterAPIClient] = None,
+                    on_progress: Optional[Callable[[int, Optional[int]], None]] = None) -> Dict:
+    """
+    Fetch an account's tweet history into sinks, one page at a time
+
+    The cursor is checkpointed after every page, so an interrupted run
+    (rate limit, crash, Ctrl+C) continues where it stopped. A page written
+    just before an interruption may be written again on resume; the
+    tweet store ignores duplicates.
+
+    Args:
+        username: Twitter username (without @)
+        max_tweets: Tweets to archive in total, including earlier runs, rounded
+            up to a whole page (None = all)
+        sinks: Objects with write(username, tweets) and optionally reset(), called
+            when the archive starts from the first page; default JSONL file + tweet store
+        resume: Continue from the saved checkpoint (False = start over)
+        client: TwitterAPIClient to use
+        on_progress: Optional callback called with (tweets so far, max_tweets)
+
+    Returns:
+        The checkpoint dict (cursor, fetched, done, error)
+
+    Raises:
+        ValueError: if the username is not a valid Twitter/X username
+        ArchiveInProgress: if the account is already being archived
+    """
+    with _account_lock(username):
+        return _archive_locked(username, max_tweets, sinks, resume, client, on_progress)
+
+
+def _archive_locked(username: str, max_tweets: Optional[int], sinks: Optional[list], resume: bool,
+                    client: Optional[TwitterAPIClient],
+                    on_progress: Optional[Callable[[int, Optional[int]], None]]) -> Dict:
+    client = client or TwitterAPIClient()
+    if sinks is None:
+        sinks = [JsonlSink(jsonl_path(username)), StoreSink()]
+
+    checkpoint = load_checkpoint(username) if resume else {
+        'username': username, 'cursor': None, 'fetched': 0, 'done': False
+    }
+    if checkpoint['done']:
+        print(f"@{username} already archived ({checkpoint['fetched']} tweets)")
+        return checkpoint
+
+    already_fetched = checkpoint['fetched']
+    remaining = max_tweets - already_fetched if max_tweets is not None else None
+    if remaining is not None and remaining <= 0:
+        return checkpoint
+
+    # Starting over - drop what an earlier run wrote, or the JSONL file would
+    # hold its tweets twice
+    if checkpoint['cursor'] is None and not already_fetched:
+        for sink in sinks:
+            if hasattr(sink, 'reset'):
+                sink.reset()
+
+    checkpoint.pop('error', None)
+    try:
+        # Whole pages only - a page cut at max_tweets would leave tweets the
+        # saved cursor has already moved past
+        for page in client.iter_tweet_pages(username, cursor=checkpoint['cursor']):
+            for sink in sinks:
+                sink.write(username, page['tweets'])
+
+            checkpoint['cursor'] = page['next_cursor']
+            checkpoint['fetched'] = already_fetched + page['fetched']
+            checkpoint['done'] = page['next_cursor'] is None
+            checkpoint['updated_at'] = datetime.now().isoformat()
+            _save_checkpoint(checkpoint)
+
+            # Reported here rather than by iter_tweet_pages, which would miss
+            # the page the max_tweets check stops on
+            if on_progress:
+                on_progress(checkpoint['fetched'], max_tweets)
+
+            if remaining is not None and page['fetched'] >= remaining:
+                break
+
+    except TwitterAPIError as e:
+        print(f"ERROR archiving @{username}: {e} (resume later from the checkpoint)")
+        checkpoint['error'] = str(e)
+        _save_checkpoint(checkpoint)
+
+    return checkpoint
+
+
+if __name__ == "__main__":
+    # Konfiguracja
+    ACCOUNTS_TO_ARCHIVE = [
+        "wallstengine",
+    ]
+    MAX_TWEETS = 10000  # Limit tweetów na konto (None = cała historia)
+
+    def print_progress(fetched, limit):
+        print(f"   Archived {fetched:,}/{limit:,} tweets" if limit else f"   Archived {fetched:,} tweets")
+
+    for username in ACCOUNTS_TO_ARCHIVE:
+        print(f"\n{'='*60}")
+        print(f"Archiving @{username}...")
+        print(f"{'='*60}")
+        try:
+            result = archive_account(username, max_tweets=MAX_TWEETS, on_progress=print_progress)
+        except ArchiveInProgress as e:
+            print(f"SKIPPED: {e}")
+            continue
+        print(f"@{username}: {result['fetched']:,} tweets, done: {result['done']}")
@@ -3,24 +3,112 @@ Batch Twitter Fetcher
 Fetches last 50 tweets from multiple accounts and saves each to separate JSON
 """
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+from itertools import repeat
 from pathlib import Path
+from typing import Dict, List, Optional
 import urllib3
 from twitter_client import TwitterAPIClient
+from tweet_fields import tweet_id_value
 from link_analyzer import LinkAnalyzer
+from link_cache import LinkCache
+from rate_limit import FileRateLimiter
+from summary_budget import SummaryBudget, merge_usage
+from trending import LinkTrends
+from tweet_store import TweetStore
 
 # Disable SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 # Lista kont do pobrania
 ACCOUNTS_TO_FETCH = [
-    "elonmusk",
-    "BillGates",
-    "BarackObama",
-    # Dodaj tutaj więcej kont
+    # Giełda (16 accounts)
+    "stocktavia",
+    "PelosiTracker_",
+    "wallstengine",
+    "ksochanek",
+    "Dan_Kostecki",
+    "HayekAndKeynes",
+    "Inwestomat_eu",
+    "hedgefundowiec",
+    "rditrych",
+    "Maciej__Czajka",
+    "PiotrZolkiewicz",
+    "PawelMalik_GG",
+    "AnalitykF",
+    "conksresearch",
+    "sentimentrader",
+    "Joker68069137",
+
+    # Kryptowaluty (5 accounts)
+    "KO_Kryptowaluty",
+    "Dystopia_PL",
+    "Dziewczynka_z_",
+    "wesleyplpl",
+    "Paul__Crow",
+
+    # Gospodarka (3 accounts)
+    "wstepien_",
+    "KamSobolewski",
+    "T_Smolarek",
+
+    # Polityka (2 accounts)
+    "realDonaldTrump",
+    "MikolajVonskyT",
+
+    # Nowinki AI (4 accounts)
+    "popai_pl",
+    "huggingface",
+    "rpl_0x",
+    "miroburn",
+
+    # Filozofia (3 accounts)
+    "orangebook_",
+    "naval",
+    "andrzejdragan",
 ]
 
-def fetch_and_save_account(username: str, max_tweets: int = 50, analyze_links: bool = True):
+# Rate limiter shared by all processes of a run and this process' Claude
+# token budget (set by _init_worker)
+_rate_limiter = None
+_summary_budget = None
+
+
+def _init_worker(requests_per_second: Optional[float], token_budget: Optional[int] = None,
+                 account_token_budget: Optional[int] = None):
+    """Configure a (worker) process before it fetches anything"""
+    global _rate_limiter, _summary_budget
+    _rate_limiter = FileRateLimiter(requests_per_second) if requests_per_second else None
+    _summary_budget = SummaryBudget(
+        max_input_tokens=token_budget,
+        max_input_tokens_per_account=account_token_budget
+    )
+    # Clients built by an earlier _init_worker hold its limiter and budget
+    _get_twitter_client.cache_clear()
+    _get_link_analyzer.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def _get_twitter_client() -> TwitterAPIClient:
+    return TwitterAPIClient(rate_limiter=_rate_limiter)
+
+
+@lru_cache(maxsize=None)
+def _get_link_analyzer() -> LinkAnalyzer:
+    # The URL cache is a SQLite file, so worker processes share it
+    return LinkAnalyzer(cache=LinkCache(), budget=_summary_budget)
+
+
+@lru_cache(maxsize=None)
+def _get_tweet_store() -> TweetStore:
+    return TweetStore()
+
+
+def fetch_and_save_account(username: str, max_tweets: int = 50, analyze_links: bool = True,
+                           since_id: Optional[str] = None):
     """
     Fetch tweets from one account and save to JSON
 
@@ -28,15 +116,21 @@ def fetch_and_save_account(username: str, max_tweets: int = 50, analyze_links: b
         username: Twitter username (without @)
         max_tweets: Number of tweets to fetch
         analyze_links: Whether to analyze links with Claude AI
+        since_id: Only keep tweets newer than this tweet id (incremental fetch).
+            Nothing is saved when there are no new tweets.
+
+    Returns:
+        Saved response data dict on success (api_requests = twitterapi.io
+        requests made), None on failure
     """
     print(f"\n{'='*60}")
     print(f"Fetching tweets for @{username}...")
     print(f"{'='*60}")
 
     try:
-        # Initialize clients
-        twitter_client = TwitterAPIClient()
-        link_analyzer = LinkAnalyzer() if analyze_links else None
+        # Clients are created once per process and reused across accounts
+        twitter_client = _get_twitter_client()
+        link_analyzer = _get_link_analyzer() if analyze_links else None
 
         # Fetch tweets
         result = twitter_client.get_user_tweets(
@@ -46,14 +140,30 @@ def fetch_and_save_account(username: str, max_tweets: int = 50, analyze_links: b
 
         if not result['success']:
             print(f"ERROR for @{username}: {result.get('error', 'Unknown error')}")
-            return False
+            return None
 
         tweets = result['tweets']
 
+        # Incremental fetch - drop tweets we have already seen
+        if since_id:
+            tweets = [t for t in tweets if tweet_id_value(t.get('id')) > tweet_id_value(since_id)]
+            if not tweets:
+                print(f"No new tweets for @{username} since {since_id}")
+                return {
+                    "success": True,
+                    "username": result['username'],
+                    "user_info": result.get('user_info'),
+                    "total_tweets": 0,
+                    "tweets": [],
+                    "error": None,
+                    "fetched_at": datetime.now().isoformat(),
+                    "api_requests": result.get('api_requests')
+                }
+
         # Analyze links if requested
         if analyze_links and tweets and link_analyzer:
             print(f"Analyzing links in {len(tweets)} tweets...")
-            tweets = link_analyzer.analyze_links(tweets)
+            tweets = link_analyzer.analyze_links(tweets, account=username)
 
         # Prepare response data
         response_data = {
@@ -62,8 +172,10 @@ def fetch_and_save_account(username: str, max_tweets: int = 50, analyze_links: b
             "user_info": result.get('user_info'),
             "total_tweets": len(tweets),
             "tweets": tweets,
+            "threads": result.get('threads', []),
             "error": None,
-            "fetched_at": datetime.now().isoformat()
+            "fetched_at": datetime.now().isoformat(),
+            "api_requests": result.get('api_requests')
         }
 
         # Create exports directory if it doesn't exist
@@ -81,6 +193,12 @@ def fetch_and_save_account(username: str, max_tweets: int = 50, analyze_links: b
 
         print(f"SUCCESS! Saved {len(tweets)} tweets to: {filepath}")
 
+        # Index tweets for search and update the daily rollups
+        try:
+            _get_tweet_store().add_tweets(result['username'], tweets, result.get('user_info'))
+        except Exception as e:
+            print(f"Warning: failed to index tweets for @{username}: {e}")
+
         # Print user stats
         if result.get('user_info'):
             info = result['user_info']
@@ -88,14 +206,72 @@ def fetch_and_save_account(username: str, max_tweets: int = 50, analyze_links: b
             print(f"   Followers: {info.get('followersCount', 0):,}")
             print(f"   Following: {info.get('followingCount', 0):,}")
 
-        return True
+        return response_data
 
     except Exception as e:
         print(f"EXCEPTION for @{username}: {str(e)}")
-        return False
+        return None
+
+
+def _fetch_shard(accounts: List[str], max_tweets: int, analyze_links: bool) -> Dict[str, List[str]]:
+    """Fetch a list of accounts one by one (runs in a worker process in process-pool mode)"""
+    results = {
+        'success': [],
+        'failed': [],
+        'link_shares': []
+    }
+
+    for i, username in enumerate(accounts, 1):
+        print(f"\n[{i}/{len(accounts)}] (pid {os.getpid()}) Processing @{username}...")
+
+        response = fetch_and_save_account(
+            username=username,
+            max_tweets=max_tweets,
+            analyze_links=analyze_links
+        )
+
+        if response:
+            results['success'].append(username)
+
+            # Only what trend counting needs is sent back to the parent process
+            shared = [
+                {'id': t['id'], 'created_at': t['created_at'], 'extracted_links': t['extracted_links']}
+                for t in response['tweets'] if t.get('extracted_links')
+            ]
+            if shared:
+                results['link_shares'].append({'username': username, 'tweets': shared})
+        else:
+            results['failed'].append(username)
+
+    results['usage'] = _summary_budget.summary() if _summary_budget else None
+    return results
+
 
+def _update_trending(link_shares: List[Dict], hours: int, top: int, analyze: bool) -> List[Dict]:
+    """Add this run's links to the cross-account trends and return the top shared links"""
+    trends = LinkTrends.load()
+    for share in link_shares:
+        trends.add_tweets(share['username'], share['tweets'])
+    trends.save()
 
-def batch_fetch_accounts(accounts: list, max_tweets: int = 50, analyze_links: bool = True):
+    top_links = trends.top_links(hours=hours, limit=top)
+
+    # Costly summaries only for the links that are actually trending
+    if analyze and top_links:
+        print(f"\nAnalyzing top {len(top_links)} trending links...")
+        analyses = _get_link_analyzer().analyze_urls(
+            [link['url'] for link in top_links], max_workers=4, account='trending'
+        )
+        for link in top_links:
+            link['analysis'] = analyses.get(link['url'])
+
+    return top_links
+
+
+def batch_fetch_accounts(accounts: list, max_tweets: int = 50, analyze_links: bool = True,
+                         workers: int = 1, requests_per_second: Optional[float] = None,
+                         trending_hours: int = 24, trending_top: int = 10, analyze_trending: bool = False,
+                         token_budget: Optional[int] = None, account_token_budget: Optional[int] = None):
     """
     Fetch tweets from multiple accounts
 
@@ -103,6 +279,16 @@ def batch_fetch_accounts(accounts: list, max_tweets: int = 50, analyze_links: bo
         accounts: List of Twitter usernames
         max_tweets: Number of tweets per account
         analyze_links: Whether to analyze links
+        workers: Number of worker processes. With more than 1 the account list
+            is sharded across a process pool (link parsing is CPU-bound).
+        requests_per_second: Global twitterapi.io request rate shared by all
+            workers (None = no limit)
+        trending_hours: Window for the "top shared links" summary
+        trending_top: Number of top shared links to report
+        analyze_trending: Analyze (fetch + Claude summary) only the top shared links
+        token_budget: Max Claude input tokens for the whole run (None = no limit).
+            In process-pool mode it is split evenly between the workers.
+        account_token_budget: Max Claude input tokens per account (None = no limit)
     """
     print("\n" + "="*60)
     print("BATCH TWITTER FETCHER")
@@ -110,26 +296,55 @@ def batch_fetch_accounts(accounts: list, max_tweets: int = 50, analyze_links: bo
     print(f"Accounts to process: {len(accounts)}")
     print(f"Tweets per account: {max_tweets}")
     print(f"Analyze links: {'Yes' if analyze_links else 'No'}")
+    print(f"Worker processes: {workers}")
     print("="*60)
 
-    results = {
-        'success': [],
-        'failed': []
-    }
-
-    for i, username in enumerate(accounts, 1):
-        print(f"\n[{i}/{len(accounts)}] Processing @{username}...")
+    if workers > 1:
+        # Round-robin shards keep the workers' account lists balanced
+        shards = [accounts[i::workers] for i in range(workers)]
+        shards = [shard for shard in shards if shard]
+
+        shard_results = []
+        with ProcessPoolExecutor(
+            max_workers=len(shards),
+            initializer=_init_worker,
+            initargs=(requests_per_second,
+                      token_budget // len(shards) if token_budget else None,
+                      account_token_budget)
+        ) as pool:
+            for shard_result in pool.map(_fetch_shard, shards, repeat(max_tweets), repeat(analyze_links)):
+                shard_results.append(shard_result)
+
+        # Merge into one summary, in the original account order
+        succeeded = {u for r in shard_results for u in r['success']}
+        results = {
+            'success': [u for u in accounts if u in succeeded],
+            'failed': [u for u in accounts if u not in succeeded],
+            'link_shares': [s for r in shard_results for s in r['link_shares']]
+        }
+        worker_usage = [r['usage'] for r in shard_results if r['usage']]
+
+        # Whatever the workers left of the budget is available for trending links
+        used = sum(u['input_tokens'] + u['cache_creation_input_tokens'] + u['cache_read_input_tokens']
+                   for u in worker_usage)
+        _init_worker(requests_per_second,
+                     max(0, token_budget - used) if token_budget else None,
+                     account_token_budget)
+    else:
+        _init_worker(requests_per_second, token_budget, account_token_budget)
+        results = _fetch_shard(accounts, max_tweets, analyze_links)
+        worker_usage = []
 
-        success = fetch_and_save_account(
-            username=username,
-            max_tweets=max_tweets,
-            analyze_links=analyze_links
+    try:
+        results['trending'] = _update_trending(
+            results.pop('link_shares'), trending_hours, trending_top, analyze_trending
         )
+    except Exception as e:
+        print(f"Warning: trending links update failed: {e}")
+        results['trending'] = []
 
-        if success:
-            results['success'].append(username)
-        else:
-            results['failed'].append(username)
+    # Claude token usage of all processes, including trending link summaries
+    results['usage'] = merge_usage(worker_usage + [_summary_budget.summary()])
 
     # Summary
     print("\n" + "="*60)
@@ -145,6 +360,28 @@ def batch_fetch_accounts(accounts: list, max_tweets: int = 50, analyze_links: bo
         for username in results['failed']:
             print(f"   - @{username}")
 
+    if results['trending']:
+        print(f"\nTop shared links (last {trending_hours}h):")
+        for link in results['trending']:
+            accounts_str = ', '.join(f"@{a}" for a in link['accounts'][:5])
+            print(f"   {link['count']:3d}x {link['url']} ({accounts_str})")
+            analysis = link.get('analysis') or {}
+            if analysis.get('ai_summary') or analysis.get('title'):
+                print(f"        {analysis.get('ai_summary') or analysis.get('title')}")
+
+    usage = results['usage']
+    if usage['calls'] or usage['skipped']:
+        print(f"\nClaude usage: {usage['calls']} summaries, "
+              f"{usage['input_tokens']:,} input / {usage['output_tokens']:,} output tokens "
+              f"(cache read {usage['cache_read_input_tokens']:,}), "
+              f"~${usage['estimated_cost_usd']:.4f}")
+        if usage['skipped']:
+            print(f"   Skipped (budget used up): {usage['skipped']}")
+        for account, account_usage in sorted(usage['per_account'].items(),
+                                             key=lambda item: item[1]['input_tokens'], reverse=True):
+            print(f"   - {account}: {account_usage['input_tokens']:,} in / "
+                  f"{account_usage['output_tokens']:,} out, ~${account_usage['estimated_cost_usd']:.4f}")
+
     print(f"\nTotal processed: {len(accounts)} accounts")
     print("="*60)
 
@@ -152,57 +389,16 @@ def batch_fetch_accounts(accounts: list, max_tweets: int = 50, analyze_links: bo
 
 
 if __name__ == "__main__":
-    # Lista kont do pobrania
-    accounts = [
-        # Giełda (16 accounts)
-        "stocktavia",
-        "PelosiTracker_",
-        "wallstengine",
-        "ksochanek",
-        "Dan_Kostecki",
-        "HayekAndKeynes",
-        "Inwestomat_eu",
-        "hedgefundowiec",
-        "rditrych",
-        "Maciej__Czajka",
-        "PiotrZolkiewicz",
-        "PawelMalik_GG",
-        "AnalitykF",
-        "conksresearch",
-        "sentimentrader",
-        "Joker68069137",
-
-        # Kryptowaluty (5 accounts)
-        "KO_Kryptowaluty",
-        "Dystopia_PL",
-        "Dziewczynka_z_",
-        "wesleyplpl",
-        "Paul__Crow",
-
-        # Gospodarka (3 accounts)
-        "wstepien_",
-        "KamSobolewski",
-        "T_Smolarek",
-
-        # Polityka (2 accounts)
-        "realDonaldTrump",
-        "MikolajVonskyT",
-
-        # Nowinki AI (4 accounts)
-        "popai_pl",
-        "huggingface",
-        "rpl_0x",
-        "miroburn",
-
-        # Filozofia (3 accounts)
-        "orangebook_",
-        "naval",
-        "andrzejdragan",
-    ]
+    accounts = ACCOUNTS_TO_FETCH
 
     # Konfiguracja
     MAX_TWEETS = 50  # Liczba tweetów na konto
     ANALYZE_LINKS = False  # Czy analizować linki (True = wolniejsze, ale z analizą AI)
+    WORKERS = 1  # Liczba procesów (>1 = konta dzielone między procesy)
+    REQUESTS_PER_SECOND = None  # Wspólny limit zapytań do twitterapi.io (None = bez limitu)
+    ANALYZE_TRENDING = False  # Czy analizować AI tylko najczęściej udostępniane linki
+    TOKEN_BUDGET = None  # Limit tokenów wejściowych Claude na cały przebieg (None = bez limitu)
+    ACCOUNT_TOKEN_BUDGET = None  # Limit tokenów wejściowych Claude na konto (None = bez limitu)
 
     print(f"Total accounts to fetch: {len(accounts)}")
     print(f"Tweets per account: {MAX_TWEETS}")
@@ -212,5 +408,10 @@ if __name__ == "__main__":
     batch_fetch_accounts(
         accounts=accounts,
         max_tweets=MAX_TWEETS,
-        analyze_links=ANALYZE_LINKS
+        analyze_links=ANALYZE_LINKS,
+        workers=WORKERS,
+        requests_per_second=REQUESTS_PER_SECOND,
+        analyze_trending=ANALYZE_TRENDING,
+        token_budget=TOKEN_BUDGET,
+        account_token_budget=ACCOUNT_TOKEN_BUDGET
     )
@@ -0,0 +1,110 @@
+"""
+Link Extraction Benchmark
+Measures link extraction throughput on synthetic twitterapi.io pages,
+comparing the page-level LinkExtractor with the old per-tweet substring checks.
+LinkExtractor does more work (text URLs, real domain matching), so this shows
+what that costs rather than a speed-up.
+
+Usage:
+    py bench_links.py [total_tweets]
+"""
+import random
+import sys
+import time
+
+from link_extract import LinkExtractor
+
+PAGE_SIZE = 20          # tweets per twitterapi.io page
+DEFAULT_TOTAL = 20000   # tweets in the bulk (archive) run
+RUNS = 5
+
+DOMAINS = [
+    "reuters.com", "bloomberg.com", "ft.com", "wsj.com", "cnbc.com",
+    "netflix.com", "substack.com", "github.com", "youtube.com", "sec.gov",
+]
+INTERNAL = ["https://twitter.com/user/status/1", "https://x.com/i/web/status/2", "https://t.co/abc123"]
+
+
+def make_tweet(rng: random.Random, i: int) -> dict:
+    """Raw tweet with 0-3 entity links, media, and a URL in the text now and then"""
+    urls = []
+    for _ in range(rng.randint(0, 3)):
+        if rng.random() < 0.3:
+            urls.append({"expandedURL": rng.choice(INTERNAL)})
+        else:
+            # Popular articles are shared by several tweets on a page
+            urls.append({"expandedURL": f"https://www.{rng.choice(DOMAINS)}/article/{rng.randint(1, 40)}"})
+
+    text = f"Tweet {i} https://t.co/{i:06d}"
+    if rng.random() < 0.2:
+        text += f" more at https://{rng.choice(DOMAINS)}/post/{i}."
+
+    entities = {"urls": urls}
+    if rng.random() < 0.2:
+        entities["media"] = [{"expandedURL": f"https://twitter.com/user/status/{i}/photo/1"}]
+
+    return {"id": str(i), "text": text, "entities": entities}
+
+
+def legacy_extract_links(tweet: dict) -> list:
+    """Previous TwitterAPIClient._extract_links, kept as the baseline"""
+    links = []
+    entities = tweet.get('entities', {})
+
+    if 'urls' in entities:
+        for url_obj in entities['urls']:
+            expanded_url = url_obj.get('expandedURL', '') or url_obj.get('expanded_url', '')
+            if expanded_url and not any(x in expanded_url.lower() for x in ['twitter.com', 'x.com', 't.co']):
+                links.append(expanded_url)
+
+    if 'media' in entities:
+        for media_obj in entities['media']:
+            expanded_url = media_obj.get('expandedURL', '') or media_obj.get('expanded_url', '')
+            if expanded_url and not any(x in expanded_url.lower() for x in ['twitter.com', 'x.com', 't.co', 'pic.twitter.com']):
+                links.append(expanded_url)
+
+    return links
+
+
+def best_time(func, pages: list) -> float:
+    best = None
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        for page in pages:
+            func(page)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(label: str, pages: list, extractor: LinkExtractor):
+    tweets = sum(len(page) for page in pages)
+    results = [
+        ("legacy per-tweet", best_time(lambda page: [legacy_extract_links(t) for t in page], pages)),
+        ("LinkExtractor page", best_time(extractor.extract_page, pages)),
+    ]
+
+    print(f"\n{label}: {len(pages):,} page(s), {tweets:,} tweets")
+    for name, seconds in results:
+        print(f"   {name:20s} {seconds * 1000:9.2f} ms  {tweets / seconds:12,.0f} tweets/s")
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_TOTAL
+
+    rng = random.Random(42)
+    tweets = [make_tweet(rng, i) for i in range(total)]
+    pages = [tweets[i:i + PAGE_SIZE] for i in range(0, total, PAGE_SIZE)]
+    extractor = LinkExtractor()
+
+    print("=" * 60)
+    print(f"LINK EXTRACTION BENCHMARK (best of {RUNS} runs)")
+    print("=" * 60)
+
+    run("Single page", pages[:1], extractor)
+    run("Bulk archive", pages, extractor)
+
+    # The old substring checks also dropped e.g. netflix.com ('x.com' in 'netflix.com')
+    legacy = sum(len(legacy_extract_links(t)) for t in tweets)
+    current = sum(len(links) for page in pages for links in extractor.extract_page(page))
+    print(f"\nLinks found: legacy {legacy:,}, LinkExtractor {current:,} (includes text URLs)")
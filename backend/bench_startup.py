@@ -0,0 +1,103 @@
+"""
+Startup Benchmark
+Measures cold import time of backend modules with `python -X importtime`
+
+Usage:
+    py bench_startup.py [module ...]
+"""
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent
+
+DEFAULT_MODULES = [
+    "twitter_client",
+    "link_analyzer",
+    "tweet_store",
+    "batch_fetch",
+    "main",
+]
+
+RUNS = 5
+
+
+def measure_import(module: str) -> dict:
+    """
+    Import a module in a fresh interpreter
+
+    Returns:
+        Dict with best wall time, cumulative import time and the slowest
+        direct imports of the module
+    """
+    best_wall = None
+    importtime_output = ""
+
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True
+        )
+        wall = time.perf_counter() - start
+
+        if proc.returncode != 0:
+            return {"module": module, "error": proc.stderr.strip().splitlines()[-1]}
+
+        if best_wall is None or wall < best_wall:
+            best_wall = wall
+            importtime_output = proc.stderr
+
+    # Lines look like: "import time:   self [us] | cumulative | imported package".
+    # Children are indented two spaces deeper and are listed before their parent.
+    imports = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((depth, int(cumulative_us), name.strip()))
+
+    target_index = next((i for i, (depth, _, name) in enumerate(imports) if depth == 0 and name == module), None)
+    if target_index is None:
+        return {"module": module, "error": "module not found in -X importtime output"}
+    target = imports[target_index][1]
+
+    # Direct children of the target: depth 1 lines since the previous top-level import
+    children = []
+    for depth, cumulative_us, name in reversed(imports[:target_index]):
+        if depth == 0:
+            break
+        if depth == 1:
+            children.append((cumulative_us, name))
+    children.sort(reverse=True)
+
+    return {
+        "module": module,
+        "wall_ms": best_wall * 1000,
+        "import_ms": target / 1000,
+        "slowest": [(c / 1000, name) for c, name in children[:5]]
+    }
+
+
+if __name__ == "__main__":
+    modules = sys.argv[1:] or DEFAULT_MODULES
+
+    print("=" * 60)
+    print(f"IMPORT TIME BENCHMARK (best of {RUNS} runs)")
+    print("=" * 60)
+
+    for module in modules:
+        result = measure_import(module)
+
+        if "error" in result:
+            print(f"\n{module}: FAILED ({result['error']})")
+            continue
+
+        print(f"\n{module}: {result['import_ms']:.1f} ms import, {result['wall_ms']:.1f} ms process")
+        for cumulative_ms, name in result["slowest"]:
+            print(f"   {cumulative_ms:8.1f} ms  {name}")
@@ -3,39 +3,84 @@ Link Analyzer - Analyzes article links from tweets
 Uses Claude API to summarize content
 """
 import requests
-from typing import Dict, List, Optional
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
 import os
 from dotenv import load_dotenv
-from anthropic import Anthropic
-from bs4 import BeautifulSoup
 from pathlib import Path
 
+from summary_budget import SummaryBudget, estimate_tokens, truncate_to_tokens
+from profiling import span
+
+# anthropic and bs4 are imported lazily - they are slow to import and not needed
+# when links are not analyzed (e.g. batch_fetch.py with ANALYZE_LINKS = False)
+
 # Load .env from parent directory
 env_path = Path(__file__).parent.parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
+CLAUDE_MODEL = "claude-3-haiku-20240307"
+SUMMARY_MAX_TOKENS = 300
+
+# Article text sent to Claude per link
+MAX_CONTENT_TOKENS = 500
+
+# Returned by _get_claude_summary when the token budget is used up
+BUDGET_EXHAUSTED = object()
+
+# Shared instruction prefix - sent as a cached system block so repeated
+# calls can reuse it (the API only caches prefixes above its minimum length)
+SUMMARY_INSTRUCTIONS = (
+    "Przeanalizuj treść artykułu podaną przez użytkownika i napisz krótkie "
+    "podsumowanie (2-3 zdania) po polsku. "
+    "Odpowiedz tylko podsumowaniem, bez dodatkowych komentarzy."
+)
+
 
 class LinkAnalyzer:
     """Analyzes links from tweets"""
 
-    def __init__(self):
+    def __init__(self, cache=None, budget: Optional[SummaryBudget] = None):
+        """
+        Args:
+            cache: Optional LinkCache - successful analyses are reused across
+                runs and worker processes instead of fetching the page again
+            budget: Default SummaryBudget for Claude calls (unlimited if None)
+        """
+        self.cache = cache
+        self.budget = budget or SummaryBudget()
         self.claude_api_key = os.getenv('CLAUDE_API_KEY')
         if self.claude_api_key:
+            from anthropic import Anthropic
             self.claude = Anthropic(api_key=self.claude_api_key)
         else:
             self.claude = None
             print("Warning: CLAUDE_API_KEY not found. Link analysis will be limited.")
 
-    def analyze_links(self, tweets: List[Dict]) -> List[Dict]:
+    def analyze_links(self, tweets: List[Dict], max_workers: int = 1,
+                      on_progress: Optional[Callable[[int, int], None]] = None,
+                      account: Optional[str] = None,
+                      budget: Optional[SummaryBudget] = None) -> List[Dict]:
         """
         Analyze all links in tweets
 
         Args:
             tweets: List of tweet dictionaries
+            max_workers: Number of links fetched in parallel (thread pool)
+            on_progress: Optional callback called with (done, total) links after
+                each link finishes. It runs in the calling thread.
+            account: Account the tweets belong to (for per-account token usage)
+            budget: SummaryBudget for this call (defaults to the analyzer's budget)
 
         Returns:
             List of tweets with analyzed links
         """
+        # Each distinct URL is analyzed once, even if several tweets share it
+        urls = [link for tweet in tweets for link in tweet.get('extracted_links', [])]
+        analyses = self.analyze_urls(urls, max_workers=max_workers, on_progress=on_progress,
+                                     account=account, budget=budget)
+
         analyzed_tweets = []
 
         for tweet in tweets:
@@ -43,22 +88,102 @@ class LinkAnalyzer:
             links = tweet.get('extracted_links', [])
 
             if links:
-                tweet_copy['analyzed_links'] = []
-
-                for link in links:
-                    analysis = self._analyze_single_link(link)
-                    tweet_copy['analyzed_links'].append(analysis)
+                tweet_copy['analyzed_links'] = [dict(analyses[link]) for link in links]
 
             analyzed_tweets.append(tweet_copy)
 
         return analyzed_tweets
 
-    def _analyze_single_link(self, url: str) -> Dict:
+    def analyze_urls(self, urls: List[str], max_workers: int = 1,
+                     on_progress: Optional[Callable[[int, int], None]] = None,
+                     account: Optional[str] = None,
+                     budget: Optional[SummaryBudget] = None) -> Dict[str, Dict]:
+        """
+        Analyze a list of URLs (duplicates are analyzed once)
+
+        Returns:
+            Dict of url -> analysis result
+        """
+        urls = list(dict.fromkeys(urls))
+        budget = budget or self.budget
+        analyses = {}
+        # Expired cache entries with ETag/Last-Modified - revalidated instead of re-analyzed
+        stale = {}
+
+        if self.cache:
+            for url in urls:
+                entry = self.cache.get_entry(url)
+                if not entry:
+                    continue
+                if entry['fresh']:
+                    analyses[url] = entry['result']
+                elif entry['etag'] or entry['last_modified']:
+                    stale[url] = entry
+            if analyses:
+                print(f"[CACHE] Reusing {len(analyses)}/{len(urls)} analyzed links")
+                if on_progress:
+                    on_progress(len(analyses), len(urls))
+            urls_to_fetch = [url for url in urls if url not in analyses]
+        else:
+            urls_to_fetch = urls
+
+        if max_workers > 1 and len(urls_to_fetch) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                # Each task runs in a copy of the caller's context so profiling spans reach the request
+                futures = {
+                    pool.submit(contextvars.copy_context().run,
+                                self._analyze_single_link, url, account, budget, stale.get(url)): url
+                    for url in urls_to_fetch
+                }
+                for future in as_completed(futures):
+                    self._store_analysis(analyses, futures[future], future.result())
+                    if on_progress:
+                        on_progress(len(analyses), len(urls))
+        else:
+            for url in urls_to_fetch:
+                self._store_analysis(analyses, url, self._analyze_single_link(url, account, budget, stale.get(url)))
+                if on_progress:
+                    on_progress(len(analyses), len(urls))
+
+        revalidated = sum(1 for url in stale if analyses[url].get('not_modified'))
+        if revalidated:
+            print(f"[CACHE] {revalidated}/{len(stale)} expired links not modified (HTTP 304)")
+
+        return analyses
+
+    def _store_analysis(self, analyses: Dict[str, Dict], url: str, analysis: Dict):
+        analyses[url] = analysis
+        etag = analysis.pop('etag', None)
+        last_modified = analysis.pop('last_modified', None)
+        not_modified = analysis.pop('not_modified', False)
+
+        if self.cache and not_modified:
+            try:
+                self.cache.touch(url)
+            except Exception as e:
+                print(f"Link cache write failed for {url}: {e}")
+            return
+
+        # Errors and budget-skipped summaries are not cached so they are retried on the next run
+        if self.cache and analysis.get('status') == 'success' and not analysis.get('ai_summary_skipped'):
+            try:
+                self.cache.set(url, analysis, etag=etag, last_modified=last_modified)
+            except Exception as e:
+                print(f"Link cache write failed for {url}: {e}")
+
+    def _analyze_single_link(self, url: str, account: Optional[str] = None,
+                             budget: Optional[SummaryBudget] = None,
+                             cached: Optional[Dict] = None) -> Dict:
         """
         Analyze a single link
 
+        Args:
+            cached: Expired LinkCache entry - the page is requested conditionally
+                and its stored analysis reused if the server answers 304
+
         Returns:
-            Dict with url, title, summary, and analysis status
+            Dict with url, title, summary, and analysis status (plus the
+            page's etag/last_modified, taken out again by _store_analysis)
         """
         result = {
             "url": url,
@@ -72,36 +197,56 @@ class LinkAnalyzer:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
-            response = requests.get(url, headers=headers, timeout=10, verify=False)
+            if cached:
+                if cached.get('etag'):
+                    headers['If-None-Match'] = cached['etag']
+                if cached.get('last_modified'):
+                    headers['If-Modified-Since'] = cached['last_modified']
+
+            with span("link_fetch"):
+                response = requests.get(url, headers=headers, timeout=10, verify=False)
+
+            if cached and response.status_code == 304:
+                # Unchanged - reuse the stored extraction and AI summary
+                return {**cached['result'], 'not_modified': True}
 
             if response.status_code != 200:
                 result['status'] = 'error'
                 result['error'] = f"HTTP {response.status_code}"
                 return result
 
+            result['etag'] = response.headers.get('ETag')
+            result['last_modified'] = response.headers.get('Last-Modified')
+
             # Parse HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
+            from bs4 import BeautifulSoup
+            with span("html_parse"):
+                soup = BeautifulSoup(response.content, 'html.parser')
 
-            # Get title
-            title_tag = soup.find('title')
-            if title_tag:
-                result['title'] = title_tag.get_text().strip()
+                # Get title
+                title_tag = soup.find('title')
+                if title_tag:
+                    result['title'] = title_tag.get_text().strip()
 
-            # Get meta description
-            meta_desc = soup.find('meta', attrs={'name': 'description'})
-            if meta_desc and meta_desc.get('content'):
-                result['summary'] = meta_desc.get('content').strip()
+                # Get meta description
+                meta_desc = soup.find('meta', attrs={'name': 'description'})
+                if meta_desc and meta_desc.get('content'):
+                    result['summary'] = meta_desc.get('content').strip()
 
             # If Claude is available, get AI summary
             if self.claude and response.text:
                 try:
                     # Get main text content
-                    paragraphs = soup.find_all('p')
-                    content_text = ' '.join([p.get_text() for p in paragraphs[:10]])  # First 10 paragraphs
+                    with span("html_parse"):
+                        paragraphs = soup.find_all('p')
+                        content_text = ' '.join([p.get_text() for p in paragraphs[:10]])  # First 10 paragraphs
 
                     if len(content_text) > 200:
-                        ai_summary = self._get_claude_summary(content_text[:2000], url)
-                        if ai_summary:
+                        content_text = truncate_to_tokens(content_text, MAX_CONTENT_TOKENS)
+                        ai_summary = self._get_claude_summary(content_text, url, account, budget or self.budget)
+                        if ai_summary is BUDGET_EXHAUSTED:
+                            result['ai_summary_skipped'] = 'budget'
+                        elif ai_summary:
                             result['ai_summary'] = ai_summary
                 except Exception as e:
                     print(f"Claude analysis failed for {url}: {e}")
@@ -117,29 +262,46 @@ class LinkAnalyzer:
 
         return result
 
-    def _get_claude_summary(self, content: str, url: str) -> Optional[str]:
-        """Get AI summary from Claude"""
+    def _get_claude_summary(self, content: str, url: str, account: Optional[str] = None,
+                            budget: Optional[SummaryBudget] = None):
+        """
+        Get AI summary from Claude
+
+        Returns:
+            Summary text, None on error, or BUDGET_EXHAUSTED if the token
+            budget does not allow another call
+        """
         if not self.claude:
             return None
 
-        try:
-            prompt = f"""Przeanalizuj poniższą treść artykułu i napisz krótkie podsumowanie (2-3 zdania) po polsku.
-
-URL: {url}
+        budget = budget or self.budget
+        prompt = f"""URL: {url}
 
 Treść:
-{content}
+{content}"""
 
-Odpowiedz tylko podsumowaniem, bez dodatkowych komentarzy."""
+        estimated_input = estimate_tokens(SUMMARY_INSTRUCTIONS) + estimate_tokens(prompt)
+        if not budget.try_reserve(account, estimated_input, SUMMARY_MAX_TOKENS):
+            print(f"Token budget used up - skipping AI summary for {url}")
+            return BUDGET_EXHAUSTED
 
-            message = self.claude.messages.create(
-                model="claude-3-haiku-20240307",
-                max_tokens=300,
-                messages=[{
-                    "role": "user",
-                    "content": prompt
-                }]
-            )
+        usage = None
+        try:
+            with span("claude"):
+                message = self.claude.messages.create(
+                    model=CLAUDE_MODEL,
+                    max_tokens=SUMMARY_MAX_TOKENS,
+                    system=[{
+                        "type": "text",
+                        "text": SUMMARY_INSTRUCTIONS,
+                        "cache_control": {"type": "ephemeral"}
+                    }],
+                    messages=[{
+                        "role": "user",
+                        "content": prompt
+                    }]
+                )
+            usage = message.usage
 
             return message.content[0].text
 
@@ -147,6 +309,9 @@ Odpowiedz tylko podsumowaniem, bez dodatkowych komentarzy."""
             print(f"Claude API error: {e}")
             return None
 
+        finally:
+            budget.record(account, estimated_input, SUMMARY_MAX_TOKENS, usage)
+
 
 # Test function
 if __name__ == "__main__":
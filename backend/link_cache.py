@@ -0,0 +1,106 @@
+"""
+Link Cache - SQLite cache of link analysis results keyed by URL
+Safe to share between threads and worker processes
+
+Entries keep the page's ETag / Last-Modified, so expired entries can be
+revalidated with a conditional request instead of a full re-analysis.
+"""
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+DB_PATH = Path(__file__).parent.parent / 'exports' / 'link_cache.db'
+
+# Reuse an analysis for a week before fetching the page again
+DEFAULT_MAX_AGE = 7 * 24 * 60 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS link_cache (
+    url TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    etag TEXT,
+    last_modified TEXT
+);
+"""
+
+# Columns added after the first release (ALTER TABLE for existing databases)
+VALIDATOR_COLUMNS = ['etag', 'last_modified']
+
+
+class LinkCache:
+    """URL -> analysis result cache"""
+
+    def __init__(self, db_path: Path = DB_PATH, max_age: float = DEFAULT_MAX_AGE):
+        self.db_path = Path(db_path)
+        self.max_age = max_age
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(link_cache)')}
+            for column in VALIDATOR_COLUMNS:
+                if column not in columns:
+                    conn.execute(f'ALTER TABLE link_cache ADD COLUMN {column} TEXT')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Cached analysis of a URL, or None if missing or older than max_age"""
+        entry = self.get_entry(url)
+        if not entry or not entry['fresh']:
+            return None
+        return entry['result']
+
+    def get_entry(self, url: str) -> Optional[Dict]:
+        """
+        Cached entry of a URL, including expired ones
+
+        Returns:
+            Dict with result, etag, last_modified and fresh (False once older
+            than max_age), or None if the URL was never cached
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT result, fetched_at, etag, last_modified FROM link_cache WHERE url = ?', (url,)
+            ).fetchone()
+
+        if not row:
+            return None
+
+        return {
+            'result': json.loads(row[0]),
+            'fresh': time.time() - row[1] <= self.max_age,
+            'etag': row[2],
+            'last_modified': row[3]
+        }
+
+    def set(self, url: str, result: Dict, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO link_cache (url, result, fetched_at, etag, last_modified) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    result = excluded.result,
+                    fetched_at = excluded.fetched_at,
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified
+                """,
+                (url, json.dumps(result, ensure_ascii=False), time.time(), etag, last_modified)
+            )
+
+    def touch(self, url: str):
+        """Mark an entry fresh again (the page was not modified)"""
+        with self._connect() as conn:
+            conn.execute('UPDATE link_cache SET fetched_at = ? WHERE url = ?', (time.time(), url))
@@ -0,0 +1,148 @@
+"""
+Link Extraction - pulls article links out of whole pages of raw tweets
+
+Links come from tweet entities (urls, media) and from URLs written in the
+text. Hosts are matched against compiled deny/allow domain patterns, once
+per distinct URL on the page.
+
+Configure extra domains in .env (comma separated, subdomains included):
+    LINK_DENY_DOMAINS=youtube.com,instagram.com
+    LINK_ALLOW_DOMAINS=reuters.com,bloomberg.com   (only these are kept)
+"""
+import os
+import re
+from typing import Dict, Iterable, List, Optional
+
+# Twitter/X internal links (profiles, photos, t.co short links)
+DEFAULT_DENY_DOMAINS = ['twitter.com', 'x.com', 't.co']
+
+URL_PATTERN = re.compile(r'https?://[^\s<>"\']+', re.IGNORECASE)
+
+# Verdicts remembered per extractor, by the URL's network location
+# (hosts repeat across pages)
+HOST_CACHE_SIZE = 10000
+
+# Punctuation that ends a sentence rather than the URL
+TRAILING_PUNCTUATION = '.,;:!?)]}\'"'
+
+# Twitter cuts long text URLs off with an ellipsis - what is left is not a link
+TRUNCATION_MARKS = ('…', '...')
+
+
+def _env_domains(name: str) -> List[str]:
+    return [d.strip() for d in os.getenv(name, '').split(',') if d.strip()]
+
+
+def compile_domains(domains: Iterable[str]) -> Optional[re.Pattern]:
+    """
+    Compile domains into one host regex matching them and their subdomains
+
+    Returns:
+        Compiled pattern, or None if there are no domains
+    """
+    domains = sorted({d.lower().strip('.') for d in domains if d})
+    if not domains:
+        return None
+    return re.compile(r'(?:^|\.)(?:' + '|'.join(map(re.escape, domains)) + r')$')
+
+
+class LinkExtractor:
+    """Extracts and filters links from raw twitterapi.io tweets"""
+
+    def __init__(self, deny_domains: Optional[Iterable[str]] = None,
+                 allow_domains: Optional[Iterable[str]] = None):
+        """
+        Args:
+            deny_domains: Domains never returned (default: Twitter/X domains)
+            allow_domains: If set, only links to these domains are returned
+        """
+        self.deny = compile_domains(DEFAULT_DENY_DOMAINS if deny_domains is None else deny_domains)
+        self.allow = compile_domains(allow_domains or [])
+        self._host_verdicts = {}
+        # Text URLs are mostly t.co short links - skip the regex when they are all denied
+        self._deny_tco = not self._host_allowed('t.co')
+
+    @classmethod
+    def from_env(cls) -> 'LinkExtractor':
+        """Default deny list plus LINK_DENY_DOMAINS / LINK_ALLOW_DOMAINS from the environment"""
+        return cls(
+            deny_domains=DEFAULT_DENY_DOMAINS + _env_domains('LINK_DENY_DOMAINS'),
+            allow_domains=_env_domains('LINK_ALLOW_DOMAINS')
+        )
+
+    def _host_allowed(self, netloc: str) -> bool:
+        host = netloc.rpartition('@')[2].partition(':')[0].lower().rstrip('.')
+        if '.' not in host:
+            return False
+        if self.deny and self.deny.search(host):
+            return False
+        return not self.allow or bool(self.allow.search(host))
+
+    def is_allowed(self, url: str) -> bool:
+        # "scheme://netloc/path" - a plain split is much cheaper than urllib.parse
+        parts = url.split('/', 3)
+        if len(parts) < 3 or not parts[0].endswith(':') or parts[1]:
+            return False
+
+        netloc = parts[2]
+        verdict = self._host_verdicts.get(netloc)
+        if verdict is None:
+            verdict = self._host_allowed(netloc)
+            if len(self._host_verdicts) >= HOST_CACHE_SIZE:
+                self._host_verdicts.clear()
+            self._host_verdicts[netloc] = verdict
+        return verdict
+
+    def _candidates(self, tweet: Dict) -> List[str]:
+        """Raw URLs of a tweet in order: entity urls, media, then text"""
+        urls = []
+        entities = tweet.get('entities') or {}
+
+        for key in ('urls', 'media'):
+            for url_obj in entities.get(key) or []:
+                expanded_url = url_obj.get('expandedURL', '') or url_obj.get('expanded_url', '')
+                if expanded_url:
+                    urls.append(expanded_url)
+
+        text = tweet.get('text') or ''
+        schemes = text.count('://')
+        if not schemes or (self._deny_tco and schemes == text.count('://t.co/')):
+            return urls
+
+        for match in URL_PATTERN.findall(text):
+            if match.endswith(TRUNCATION_MARKS):
+                continue
+            url = match.rstrip(TRAILING_PUNCTUATION)
+            if url:
+                urls.append(url)
+
+        return urls
+
+    def extract_page(self, tweets: List[Dict]) -> List[List[str]]:
+        """
+        Extract links for a whole page of raw tweets
+
+        Each distinct URL on the page is parsed and filtered once, however
+        many tweets share it.
+
+        Returns:
+            One list of unique links per tweet, in the order of `tweets`
+        """
+        verdicts = {}
+        pages_links = []
+        for tweet in tweets:
+            links = []
+            for url in self._candidates(tweet):
+                verdict = verdicts.get(url)
+                if verdict is None:
+                    verdict = verdicts[url] = self.is_allowed(url)
+                # A handful of links per tweet - a list beats a set here
+                if verdict and url not in links:
+                    links.append(url)
+            pages_links.append(links)
+
+        return pages_links
+
+    def extract(self, tweet: Dict) -> List[str]:
+        """Extract links from a single raw tweet"""
+        return self.extract_page([tweet])[0]
@@ -2,12 +2,15 @@
 Twitter Analyzer API
 FastAPI backend for analyzing Twitter/X accounts
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from pydantic import BaseModel, Field
 from typing import Optional
+from contextlib import asynccontextmanager
 import os
+import threading
+import time
 import json
 from datetime import datetime
 from dotenv import load_dotenv
@@ -16,6 +19,14 @@ from pathlib import Path
 
 from twitter_client import TwitterAPIClient
 from link_analyzer import LinkAnalyzer
+from link_cache import LinkCache
+from tweet_store import TweetStore
+from trending import STATE_PATH as TRENDS_STATE_PATH, LinkTrends
+from summary_budget import SummaryBudget
+from archive import (ArchiveInProgress, JsonlSink, StoreSink, USERNAME_PATTERN, archive_account,
+                     jsonl_path, load_checkpoint, valid_username)
+from profiling import (ProfilingConfig, RequestProfiler, list_profiles, log_slow_request,
+                       read_slow_requests, span, summarize_spans)
 
 # Disable SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -24,10 +35,109 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 env_path = Path(__file__).parent.parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
+# Clients are created on first use, not at import time, so uvicorn reloads
+# and one-off runs do not pay for SDKs they never touch
+_clients = {}
+
+
+def get_twitter_client() -> TwitterAPIClient:
+    if 'twitter' not in _clients:
+        _clients['twitter'] = TwitterAPIClient()
+    return _clients['twitter']
+
+
+def get_link_analyzer() -> LinkAnalyzer:
+    # Builds the Anthropic client - only needed when analyze_links is requested
+    if 'links' not in _clients:
+        # Shared with batch_fetch.py - expired entries are revalidated with ETag/Last-Modified
+        _clients['links'] = LinkAnalyzer(cache=LinkCache())
+    return _clients['links']
+
+
+def get_tweet_store() -> TweetStore:
+    if 'store' not in _clients:
+        _clients['store'] = TweetStore()
+    return _clients['store']
+
+
+def request_budget(token_budget: Optional[int] = None) -> SummaryBudget:
+    """Claude token budget for one API request"""
+    if token_budget is None and os.getenv('CLAUDE_TOKEN_BUDGET'):
+        token_budget = int(os.getenv('CLAUDE_TOKEN_BUDGET'))
+    return SummaryBudget(max_input_tokens=token_budget)
+
+
+_trends_lock = threading.Lock()
+
+# The trend state file is written at most this often. Tweets counted since the
+# last write are kept and applied again on top of the file if batch_fetch.py
+# rewrote it in between, so neither side loses counts.
+TRENDS_SAVE_INTERVAL = 60
+
+# (username, tweets) counted in memory but not yet written
+_pending_trends = []
+
+
+def _current_link_trends() -> LinkTrends:
+    """In-memory trends, reloaded when the state file changed (caller holds _trends_lock)"""
+    mtime = TRENDS_STATE_PATH.stat().st_mtime if TRENDS_STATE_PATH.exists() else None
+    if 'trends' not in _clients or _clients['trends_mtime'] != mtime:
+        trends = LinkTrends.load()
+        for username, tweets in _pending_trends:
+            trends.add_tweets(username, tweets)
+        _clients['trends'] = trends
+        _clients['trends_mtime'] = mtime
+    return _clients['trends']
+
+
+def _flush_link_trends():
+    """Write pending trend counts (caller holds _trends_lock)"""
+    trends = _current_link_trends()
+    trends.save()
+    _clients['trends_mtime'] = TRENDS_STATE_PATH.stat().st_mtime
+    _clients['trends_saved_at'] = time.time()
+    _pending_trends.clear()
+
+
+def get_link_trends() -> LinkTrends:
+    """Cross-account link trends, reloaded when batch_fetch.py updated the state file"""
+    with _trends_lock:
+        return _current_link_trends()
+
+
+def record_link_trends(username: str, tweets: list):
+    # Only what LinkTrends reads is kept for re-applying
+    tweets = [
+        {'id': t.get('id'), 'created_at': t.get('created_at'), 'extracted_links': t['extracted_links']}
+        for t in tweets if t.get('extracted_links')
+    ]
+    with _trends_lock:
+        if not _current_link_trends().add_tweets(username, tweets):
+            return
+        _pending_trends.append((username, tweets))
+        if time.time() - _clients.get('trends_saved_at', 0) >= TRENDS_SAVE_INTERVAL:
+            _flush_link_trends()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up the clients every request needs and close them on shutdown"""
+    get_twitter_client()
+    get_tweet_store()
+    yield
+    with _trends_lock:
+        if _pending_trends:
+            _flush_link_trends()
+    if 'twitter' in _clients:
+        _clients['twitter'].close()
+    _clients.clear()
+
+
 app = FastAPI(
     title="Twitter Analyzer API",
     description="Analyze Twitter/X accounts and extract article links",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS - Allow frontend to connect
@@ -39,9 +149,49 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize clients
-twitter_client = TwitterAPIClient()
-link_analyzer = LinkAnalyzer()
+# Opt-in request profiling (PROFILING_ENABLED=1 in .env)
+profiling_config = ProfilingConfig()
+
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    """
+    Time each request by span (twitter_api, link_fetch, html_parse, claude)
+
+    Requests slower than PROFILING_SLOW_MS are written to the slow-request
+    log; a PROFILING_SAMPLE_RATE share of requests is also run under cProfile.
+    """
+    if not profiling_config.enabled or request.url.path.startswith('/api/debug'):
+        return await call_next(request)
+
+    label = f"{request.method} {request.url.path}"
+    with RequestProfiler(label, capture=profiling_config.should_capture()) as profiler:
+        response = await call_next(request)
+
+    spans = summarize_spans(profiler.spans)
+    response.headers['Server-Timing'] = ', '.join(
+        [f"{name};dur={entry['total_ms']}" for name, entry in spans.items()] +
+        [f"total;dur={profiler.duration_ms:.1f}"]
+    )
+
+    if profiler.duration_ms >= profiling_config.slow_ms:
+        print(f"[SLOW] {label} took {profiler.duration_ms:.0f} ms")
+        try:
+            log_slow_request({
+                "timestamp": datetime.now().isoformat(),
+                "method": request.method,
+                "path": request.url.path,
+                "query": request.url.query,
+                "status": response.status_code,
+                "duration_ms": round(profiler.duration_ms, 1),
+                "spans": spans,
+                "profile": profiler.profile_path.name if profiler.profile_path else None
+            })
+        except Exception as e:
+            print(f"Slow request log write failed: {e}")
+
+    return response
+
 
 
 class AnalyzeRequest(BaseModel):
@@ -50,6 +200,14 @@ class AnalyzeRequest(BaseModel):
     max_tweets: Optional[int] = Field(50, description="Number of tweets to fetch (5-100)", ge=5, le=100)
     analyze_links: Optional[bool] = Field(True, description="Whether to analyze article links")
     save_to_json: Optional[bool] = Field(False, description="Save results to JSON file")
+    token_budget: Optional[int] = Field(None, description="Max Claude input tokens for link summaries (default: CLAUDE_TOKEN_BUDGET env)", ge=0)
+
+
+class ArchiveRequest(BaseModel):
+    """Request model for /api/archive endpoint"""
+    username: str = Field(..., description="Twitter/X username (without @)", pattern=USERNAME_PATTERN.pattern)
+    max_tweets: Optional[int] = Field(None, description="Total tweets to archive (default: whole history)", ge=1)
+    resume: Optional[bool] = Field(True, description="Continue from the last checkpoint")
 
 
 class AnalyzeResponse(BaseModel):
@@ -59,6 +217,8 @@ class AnalyzeResponse(BaseModel):
     user_info: Optional[dict] = None
     total_tweets: int
     tweets: list
+    threads: Optional[list] = None
+    claude_usage: Optional[dict] = None
     error: Optional[str] = None
     json_file_path: Optional[str] = None
 
@@ -95,7 +255,7 @@ async def analyze_user(request: AnalyzeRequest):
     try:
         # Fetch tweets
         print(f"Fetching tweets for @{request.username}...")
-        result = twitter_client.get_user_tweets(
+        result = get_twitter_client().get_user_tweets(
             username=request.username,
             max_results=request.max_tweets
         )
@@ -107,11 +267,26 @@ async def analyze_user(request: AnalyzeRequest):
             )
 
         tweets = result['tweets']
+        claude_usage = None
 
         # Analyze links if requested
         if request.analyze_links and tweets:
             print(f"Analyzing links in {len(tweets)} tweets...")
-            tweets = link_analyzer.analyze_links(tweets)
+            budget = request_budget(request.token_budget)
+            tweets = get_link_analyzer().analyze_links(tweets, account=request.username, budget=budget)
+            claude_usage = budget.summary()
+
+        # Index tweets for /api/search and the daily rollups
+        try:
+            with span("store_index"):
+                get_tweet_store().add_tweets(result['username'], tweets, result.get('user_info'))
+        except Exception as e:
+            print(f"Failed to index tweets: {e}")
+
+        try:
+            record_link_trends(result['username'], tweets)
+        except Exception as e:
+            print(f"Failed to update link trends: {e}")
 
         # Prepare response data
         response_data = {
@@ -120,6 +295,8 @@ async def analyze_user(request: AnalyzeRequest):
             "user_info": result.get('user_info'),
             "total_tweets": len(tweets),
             "tweets": tweets,
+            "threads": result.get('threads', []),
+            "claude_usage": claude_usage,
             "error": None,
             "json_file_path": None
         }
@@ -154,10 +331,218 @@ async def analyze_user(request: AnalyzeRequest):
         )
 
 
+@app.get("/api/search")
+async def search_tweets(
+    q: Optional[str] = Query(None, description="Full-text query (tweet text, link titles, AI summaries)"),
+    username: Optional[str] = Query(None, description="Only tweets from this account"),
+    domain: Optional[str] = Query(None, description="Only tweets linking to this domain"),
+    date_from: Optional[str] = Query(None, description="First day (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(None, description="Last day (YYYY-MM-DD)"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100)
+):
+    """
+    Search stored tweets
+
+    Searches everything fetched through /api/analyze and batch_fetch.py
+    """
+    try:
+        return get_tweet_store().search(
+            query=q,
+            username=username,
+            domain=domain,
+            date_from=date_from,
+            date_to=date_to,
+            page=page,
+            page_size=page_size
+        )
+    except Exception as e:
+        print(f"Error in search_tweets: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+
+@app.get("/api/accounts/{username}/timeseries")
+async def account_timeseries(
+    username: str,
+    date_from: Optional[str] = Query(None, description="First day (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(None, description="Last day (YYYY-MM-DD)")
+):
+    """
+    Daily activity of an account
+
+    Tweet and link counts, summed/max metrics, links per domain and follower
+    snapshots per day - served from precomputed rollups
+    """
+    try:
+        return {
+            "username": username,
+            "days": get_tweet_store().account_timeseries(
+                username=username,
+                date_from=date_from,
+                date_to=date_to
+            )
+        }
+    except Exception as e:
+        print(f"Error in account_timeseries: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+
+@app.get("/api/trending")
+async def trending_links(
+    hours: int = Query(24, ge=1, le=168, description="Time window in hours"),
+    limit: int = Query(10, ge=1, le=50, description="Number of links/domains"),
+    analyze: bool = Query(False, description="Analyze the top links with Claude AI")
+):
+    """
+    Most shared links and domains across all fetched accounts
+
+    With analyze=true only the returned top links are fetched and summarized
+    """
+    try:
+        trends = get_link_trends()
+        with _trends_lock:
+            top_links = trends.top_links(hours=hours, limit=limit)
+            top_domains = trends.top_domains(hours=hours, limit=limit)
+
+        claude_usage = None
+        if analyze and top_links:
+            budget = request_budget()
+            analyses = get_link_analyzer().analyze_urls(
+                [link['url'] for link in top_links], max_workers=4, account='trending', budget=budget
+            )
+            for link in top_links:
+                link['analysis'] = analyses.get(link['url'])
+            claude_usage = budget.summary()
+
+        return {
+            "hours": hours,
+            "links": top_links,
+            "domains": top_domains,
+            "claude_usage": claude_usage
+        }
+    except Exception as e:
+        print(f"Error in trending_links: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+
+# Accounts with an archive task queued or running in this process
+_archives_running = set()
+_archives_lock = threading.Lock()
+
+
+def run_archive(username: str, max_tweets: Optional[int], resume: bool):
+    try:
+        sinks = [JsonlSink(jsonl_path(username)), StoreSink(get_tweet_store())]
+        result = archive_account(username, max_tweets=max_tweets, sinks=sinks, resume=resume,
+                                 client=get_twitter_client())
+        print(f"[ARCHIVE] @{username}: {result['fetched']} tweets, done: {result['done']}")
+    except ArchiveInProgress as e:
+        # Another process (e.g. archive.py) holds the account's lock
+        print(f"[ARCHIVE] {e}")
+    except Exception as e:
+        print(f"Error archiving @{username}: {e}")
+    finally:
+        with _archives_lock:
+            _archives_running.discard(username.lower())
+
+
+@app.post("/api/archive")
+async def start_archive(request: ArchiveRequest, background_tasks: BackgroundTasks):
+    """
+    Archive an account's tweet history into the tweet store
+
+    Runs in the background, page by page, and can be resumed after errors
+    by posting again. Poll GET /api/archive/{username} for progress.
+    """
+    with _archives_lock:
+        if request.username.lower() in _archives_running:
+            raise HTTPException(
+                status_code=409,
+                detail=f"@{request.username} is already being archived"
+            )
+        _archives_running.add(request.username.lower())
+
+    background_tasks.add_task(run_archive, request.username, request.max_tweets, request.resume)
+    return {
+        "success": True,
+        "username": request.username,
+        "status": "started"
+    }
+
+
+@app.get("/api/archive/{username}")
+async def archive_status(username: str):
+    """Progress of an account's archive (from its checkpoint)"""
+    if not valid_username(username):
+        raise HTTPException(status_code=400, detail=f"Invalid username: {username}")
+
+    try:
+        with _archives_lock:
+            running = username.lower() in _archives_running
+        return {**load_checkpoint(username), "running": running}
+    except Exception as e:
+        print(f"Error in archive_status: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+
+def require_profiling():
+    if not profiling_config.enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (set PROFILING_ENABLED=1)")
+
+
+@app.get("/api/debug/slow-requests")
+async def slow_requests(limit: int = Query(50, ge=1, le=500)):
+    """Most recent slow requests with their span breakdown"""
+    require_profiling()
+    return {
+        "slow_ms": profiling_config.slow_ms,
+        "requests": read_slow_requests(limit)
+    }
+
+
+@app.get("/api/debug/profiles")
+async def profiles():
+    """Sampled cProfile captures, newest first"""
+    require_profiling()
+    return {
+        "sample_rate": profiling_config.sample_rate,
+        "profiles": [
+            {"name": path.name, "size": path.stat().st_size, "url": f"/api/debug/profiles/{path.name}"}
+            for path in list_profiles()
+        ]
+    }
+
+
+@app.get("/api/debug/profiles/{name}")
+async def download_profile(name: str):
+    """
+    Download a cProfile capture
+
+    Open with `python -m pstats <file>` or snakeviz
+    """
+    require_profiling()
+    path = next((p for p in list_profiles() if p.name == name), None)
+    if not path:
+        raise HTTPException(status_code=404, detail=f"Profile not found: {name}")
+    return FileResponse(path, media_type="application/octet-stream", filename=name)
+
+
 @app.get("/api/test/{username}")
 async def test_user_lookup(username: str):
     """Quick test endpoint to lookup a user"""
-    user_info = twitter_client.get_user_info(username)
+    user_info = get_twitter_client().get_user_info(username)
 
     if user_info:
         return {
@@ -0,0 +1,178 @@
+"""
+Request Profiling - span timings, slow-request log and sampled cProfile captures
+
+Opt-in through .env:
+    PROFILING_ENABLED=1
+    PROFILING_SLOW_MS=2000         (requests slower than this go to the slow log)
+    PROFILING_SAMPLE_RATE=0.05     (share of requests captured with cProfile)
+
+Code marks the parts worth timing with `with span("name"):`. Spans are
+collected per request through a context variable, so they are no-ops
+outside a profiled request (CLI scripts, batch_fetch.py).
+
+cProfile only sees the thread it was enabled on - the event loop. Work
+handed to thread pools (sync endpoints, link analysis workers) is missing
+from .prof captures; spans recorded there still show up in the request's
+timings as long as the pool runs them in a copy of the request context.
+"""
+import contextvars
+import cProfile
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+EXPORTS_DIR = Path(__file__).parent.parent / 'exports'
+SLOW_LOG_PATH = EXPORTS_DIR / 'slow_requests.jsonl'
+PROFILE_DIR = EXPORTS_DIR / 'profiles'
+
+# Newest captures kept on disk
+MAX_PROFILES = 20
+
+# The slow log is rotated to slow_requests.jsonl.1 past this size
+MAX_SLOW_LOG_BYTES = 5 * 1024 * 1024
+
+# Spans of the current request (None = not recording)
+_spans: contextvars.ContextVar[Optional[List]] = contextvars.ContextVar('profiling_spans', default=None)
+
+# cProfile can only run one capture at a time
+_capture_lock = threading.Lock()
+
+
+@contextmanager
+def span(name: str):
+    """Time a block and record it in the current request's spans"""
+    spans = _spans.get()
+    if spans is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        # list.append is atomic - spans from worker threads are safe
+        spans.append((name, (time.perf_counter() - start) * 1000))
+
+
+def summarize_spans(spans: List) -> Dict:
+    """name -> {count, total_ms, max_ms}"""
+    summary = {}
+    for name, ms in spans:
+        entry = summary.setdefault(name, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        entry['count'] += 1
+        entry['total_ms'] += ms
+        entry['max_ms'] = max(entry['max_ms'], ms)
+
+    return {
+        name: {**entry, 'total_ms': round(entry['total_ms'], 1), 'max_ms': round(entry['max_ms'], 1)}
+        for name, entry in summary.items()
+    }
+
+
+class RequestProfiler:
+    """Records spans for one request, optionally under cProfile"""
+
+    def __init__(self, label: str, capture: bool = False):
+        self.label = label
+        self.spans = []
+        self.duration_ms = None
+        self.profile_path = None
+        self._capture = capture
+        self._profile = None
+
+    def __enter__(self) -> 'RequestProfiler':
+        if self._capture and _capture_lock.acquire(blocking=False):
+            self._profile = cProfile.Profile()
+        self._token = _spans.set(self.spans)
+        self._start = time.perf_counter()
+        if self._profile:
+            self._profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self._profile:
+            self._profile.disable()
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+        _spans.reset(self._token)
+
+        if self._profile:
+            try:
+                self.profile_path = self._save_profile()
+            finally:
+                _capture_lock.release()
+        return False
+
+    def _save_profile(self) -> Path:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        safe_label = ''.join(c if c.isalnum() else '_' for c in self.label).strip('_')
+        path = PROFILE_DIR / f"{datetime.now():%Y%m%d_%H%M%S_%f}_{safe_label}.prof"
+        self._profile.dump_stats(path)
+
+        for old in list_profiles()[MAX_PROFILES:]:
+            old.unlink(missing_ok=True)
+        return path
+
+
+class ProfilingConfig:
+    """Profiling settings from the environment"""
+
+    def __init__(self):
+        self.enabled = os.getenv('PROFILING_ENABLED', '0').lower() in ('1', 'true', 'yes')
+        self.slow_ms = float(os.getenv('PROFILING_SLOW_MS', '2000'))
+        self.sample_rate = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+
+    def should_capture(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+
+def log_slow_request(entry: Dict):
+    """Append one request to the slow-request log (JSON Lines), rotating it when full"""
+    SLOW_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        if SLOW_LOG_PATH.stat().st_size >= MAX_SLOW_LOG_BYTES:
+            SLOW_LOG_PATH.replace(SLOW_LOG_PATH.with_suffix('.jsonl.1'))
+    except FileNotFoundError:
+        pass
+
+    with open(SLOW_LOG_PATH, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+
+def _tail_lines(path: Path, limit: int, block_size: int = 64 * 1024) -> List[bytes]:
+    """Last `limit` lines of a file, read backwards in blocks"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b''
+        while position > 0 and data.count(b'\n') <= limit:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+
+    lines = data.splitlines()
+    # The first line may be cut in half unless the read reached the start
+    if position > 0:
+        lines = lines[1:]
+    return lines[-limit:]
+
+
+def read_slow_requests(limit: int = 50) -> List[Dict]:
+    """Most recent slow-request log entries, newest first (reads only the end of the log)"""
+    if limit <= 0 or not SLOW_LOG_PATH.exists():
+        return []
+    lines = _tail_lines(SLOW_LOG_PATH, limit)
+    return [json.loads(line) for line in reversed(lines) if line.strip()]
+
+
+def list_profiles() -> List[Path]:
+    """Saved cProfile captures, newest first"""
+    if not PROFILE_DIR.exists():
+        return []
+    return sorted(PROFILE_DIR.glob('*.prof'), reverse=True)
@@ -0,0 +1,83 @@
+"""
+Cross-process rate limiter
+Worker processes share one request rate through a small state file guarded by a file lock.
+The file lock helpers are also used for other cross-process locks (archive runs).
+"""
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_PATH = Path(__file__).parent.parent / 'exports' / '.rate_limit'
+
+
+class FileRateLimiter:
+    """
+    Spaces requests at least `min_interval` seconds apart across all processes
+    using the same lock file.
+
+    Each caller reserves the next free slot under the lock and then sleeps
+    outside of it, so waiting processes do not block each other.
+    """
+
+    def __init__(self, requests_per_second: float, lock_path: Path = LOCK_PATH):
+        self.min_interval = 1.0 / requests_per_second
+        self.lock_path = Path(lock_path)
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def acquire(self):
+        """Block until this process may send the next request"""
+        with open(self.lock_path, 'a+') as f:
+            lock_file(f)
+            try:
+                f.seek(0)
+                content = f.read().strip()
+                next_slot = float(content) if content else 0.0
+
+                now = time.time()
+                slot = max(now, next_slot)
+
+                f.seek(0)
+                f.truncate()
+                f.write(repr(slot + self.min_interval))
+                f.flush()
+            finally:
+                unlock_file(f)
+
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+
+
+def lock_file(f):
+    """Exclusive lock on an open file, waiting until it is free"""
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def try_lock_file(f) -> bool:
+    """Lock without waiting - False if another process or file handle holds it"""
+    try:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def unlock_file(f):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
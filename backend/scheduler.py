@@ -0,0 +1,274 @@
+"""
+Fetch Scheduler
+Long-running daemon that polls accounts on an adaptive interval.
+
+Each account is polled more or less often depending on its observed posting
+rate (derived from created_at gaps), so the request budget goes to active
+accounts instead of dormant ones.
+"""
+import heapq
+import json
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from batch_fetch import ACCOUNTS_TO_FETCH, fetch_and_save_account
+from tweet_fields import parse_created_at, tweet_id_value
+from threads import MAX_ANCESTOR_ROUNDS
+from trending import STATE_PATH as TRENDS_STATE_PATH, LinkTrends
+
+STATE_PATH = Path(__file__).parent.parent / 'exports' / 'scheduler_state.json'
+
+# twitterapi.io returns ~20 tweets per page
+PAGE_SIZE = 20
+
+# Poll when roughly this many new tweets are expected, so one page is enough
+TARGET_NEW_TWEETS = 10
+
+MIN_INTERVAL = 15 * 60        # 15 minutes
+MAX_INTERVAL = 24 * 60 * 60   # 24 hours
+
+# How many created_at timestamps to keep per account for rate estimation
+HISTORY_SIZE = 50
+
+
+class RequestBudget:
+    """Sliding-window budget of API requests shared by all accounts"""
+
+    def __init__(self, max_requests: int, period: float = 3600):
+        self.max_requests = max_requests
+        self.period = period
+        self._spent = deque()
+
+    def _expire(self, now: float):
+        while self._spent and self._spent[0] <= now - self.period:
+            self._spent.popleft()
+
+    def wait_time(self, cost: int) -> float:
+        """Seconds until `cost` requests fit in the window (0 if they fit now)"""
+        now = time.time()
+        self._expire(now)
+
+        overflow = len(self._spent) + cost - self.max_requests
+        if overflow <= 0 or not self._spent:
+            return 0.0
+        overflow = min(overflow, len(self._spent))
+
+        # Wait until enough old requests leave the window
+        return self._spent[overflow - 1] + self.period - now
+
+    def spend(self, cost: int):
+        now = time.time()
+        for _ in range(cost):
+            self._spent.append(now)
+
+
+class AccountSchedule:
+    """Polling state of one account"""
+
+    def __init__(self, username: str, last_tweet_id: Optional[str] = None,
+                 history: Optional[List[float]] = None, next_due: float = 0.0):
+        self.username = username
+        self.last_tweet_id = last_tweet_id
+        self.history = sorted(history or [])[-HISTORY_SIZE:]
+        self.next_due = next_due
+
+    def tweets_per_second(self, now: float) -> float:
+        """
+        Posting rate estimated from created_at gaps.
+
+        The span runs until `now` rather than the newest tweet, so an account
+        that went quiet slowly drifts towards the maximum interval.
+        """
+        if not self.history:
+            return 0.0
+
+        span = now - self.history[0]
+        if span <= 0:
+            return 0.0
+
+        return len(self.history) / span
+
+    def interval(self, now: float) -> float:
+        rate = self.tweets_per_second(now)
+        if rate <= 0:
+            return MAX_INTERVAL
+
+        return min(MAX_INTERVAL, max(MIN_INTERVAL, TARGET_NEW_TWEETS / rate))
+
+    def record_tweets(self, tweets: List[Dict]):
+        """Remember created_at timestamps and the newest id of freshly fetched tweets"""
+        for tweet in tweets:
+            created = parse_created_at(tweet.get('created_at', ''))
+            if created:
+                self.history.append(created.timestamp())
+
+            tweet_id = tweet.get('id')
+            if tweet_id and (not self.last_tweet_id or tweet_id_value(tweet_id) > tweet_id_value(self.last_tweet_id)):
+                self.last_tweet_id = tweet_id
+
+        self.history = sorted(set(self.history))[-HISTORY_SIZE:]
+
+    def to_dict(self) -> Dict:
+        return {
+            "last_tweet_id": self.last_tweet_id,
+            "history": self.history,
+            "next_due": self.next_due
+        }
+
+
+class FetchScheduler:
+    """
+    Priority queue of accounts ordered by next due time.
+
+    Accounts with a higher posting rate win ties, and because their interval
+    is shorter they come due more often and get most of the request budget.
+    """
+
+    def __init__(self, accounts: List[str], requests_per_hour: int = 120,
+                 analyze_links: bool = False, state_path: Path = STATE_PATH,
+                 trends_path: Path = TRENDS_STATE_PATH):
+        self.analyze_links = analyze_links
+        self.state_path = state_path
+        self.trends_path = trends_path
+        self.budget = RequestBudget(requests_per_hour)
+        self.accounts = self._load_state(accounts)
+        self._queue = []
+
+        now = time.time()
+        for schedule in self.accounts.values():
+            self._push(schedule, now)
+
+    def _load_state(self, accounts: List[str]) -> Dict[str, AccountSchedule]:
+        saved = {}
+        if self.state_path.exists():
+            try:
+                with open(self.state_path, 'r', encoding='utf-8') as f:
+                    saved = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: could not read scheduler state: {e}")
+
+        return {
+            username: AccountSchedule(username, **saved.get(username, {}))
+            for username in accounts
+        }
+
+    def save_state(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({u: s.to_dict() for u, s in self.accounts.items()}, f, indent=2)
+        tmp_path.replace(self.state_path)
+
+    def _push(self, schedule: AccountSchedule, now: float):
+        rate = schedule.tweets_per_second(now)
+        heapq.heappush(self._queue, (schedule.next_due, -rate, schedule.username))
+
+    @staticmethod
+    def request_cost() -> int:
+        # Upper estimate, used to decide whether a poll fits in the budget: one user
+        # info lookup, the most pages get_user_tweets may request and one batched
+        # thread ancestor lookup per level
+        return 1 + (PAGE_SIZE // 20) + 1 + MAX_ANCESTOR_ROUNDS
+
+    def _record_trends(self, username: str, tweets: List[Dict]):
+        """Add polled links to the cross-account trends shared with batch runs and the API"""
+        shared = [t for t in tweets if t.get('extracted_links')]
+        if not shared:
+            return
+        try:
+            trends = LinkTrends.load(self.trends_path)
+            trends.add_tweets(username, shared)
+            trends.save()
+        except Exception as e:
+            print(f"Warning: trending links update failed for @{username}: {e}")
+
+    def poll(self, schedule: AccountSchedule) -> int:
+        """
+        Fetch one page of new tweets for an account, count its links in the
+        trends and reschedule it
+
+        Returns:
+            API requests the poll made (the estimate if the fetch failed)
+        """
+        response = fetch_and_save_account(
+            username=schedule.username,
+            max_tweets=PAGE_SIZE,
+            analyze_links=self.analyze_links,
+            since_id=schedule.last_tweet_id
+        )
+
+        tweets = response['tweets'] if response else []
+        schedule.record_tweets(tweets)
+        self._record_trends(schedule.username, tweets)
+
+        now = time.time()
+        interval = schedule.interval(now)
+
+        # A full page of new tweets means we probably missed some - come back sooner
+        if len(tweets) >= PAGE_SIZE:
+            interval = MIN_INTERVAL
+
+        schedule.next_due = now + interval
+        due_at = datetime.fromtimestamp(schedule.next_due, tz=timezone.utc).strftime('%Y-%m-%d %H:%M UTC')
+        print(f"[SCHEDULER] @{schedule.username}: next poll in {interval / 60:.0f} min ({due_at})")
+
+        if response and response.get('api_requests') is not None:
+            return response['api_requests']
+        return self.request_cost()
+
+    def run_pending(self) -> float:
+        """
+        Run every fetch that is due and fits in the budget.
+
+        Returns:
+            Seconds to sleep before anything else can run
+        """
+        cost = self.request_cost()
+
+        while self._queue:
+            next_due, _, username = self._queue[0]
+            now = time.time()
+
+            if next_due > now:
+                return next_due - now
+
+            wait = self.budget.wait_time(cost)
+            if wait > 0:
+                print(f"[SCHEDULER] Request budget used up, waiting {wait:.0f}s")
+                return wait
+
+            heapq.heappop(self._queue)
+            schedule = self.accounts[username]
+
+            self.budget.spend(self.poll(schedule))
+            self._push(schedule, time.time())
+            self.save_state()
+
+        return MAX_INTERVAL
+
+    def run_forever(self, max_sleep: float = 60):
+        print(f"[SCHEDULER] Watching {len(self.accounts)} accounts "
+              f"(budget: {self.budget.max_requests} requests/hour)")
+        try:
+            while True:
+                time.sleep(min(max_sleep, max(1.0, self.run_pending())))
+        except KeyboardInterrupt:
+            print("\n[SCHEDULER] Stopping...")
+        finally:
+            self.save_state()
+
+
+if __name__ == "__main__":
+    # Konfiguracja
+    REQUESTS_PER_HOUR = 120  # Globalny limit zapytań do twitterapi.io
+    ANALYZE_LINKS = False  # Czy analizować linki (True = wolniejsze, ale z analizą AI)
+
+    scheduler = FetchScheduler(
+        accounts=ACCOUNTS_TO_FETCH,
+        requests_per_hour=REQUESTS_PER_HOUR,
+        analyze_links=ANALYZE_LINKS
+    )
+    scheduler.run_forever()
@@ -0,0 +1,155 @@
+"""
+Summary Budget - token accounting and limits for Claude link summaries
+"""
+import threading
+from typing import Dict, List, Optional
+
+# Rough chars-per-token ratio used for estimates and truncation (no local tokenizer)
+CHARS_PER_TOKEN = 4
+
+# claude-3-haiku prices in USD per million tokens
+PRICE_PER_MTOK = {
+    'input_tokens': 0.25,
+    'output_tokens': 1.25,
+    'cache_creation_input_tokens': 0.30,
+    'cache_read_input_tokens': 0.03,
+}
+
+USAGE_FIELDS = list(PRICE_PER_MTOK)
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to about `max_tokens` tokens, on a word boundary when possible"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+
+    cut = text[:max_chars]
+    space = cut.rfind(' ')
+    return cut[:space] if space > max_chars // 2 else cut
+
+
+def _empty_usage() -> Dict:
+    usage = {field: 0 for field in USAGE_FIELDS}
+    usage['calls'] = 0
+    usage['skipped'] = 0
+    return usage
+
+
+def _cost(usage: Dict) -> float:
+    return sum(usage.get(field, 0) * price for field, price in PRICE_PER_MTOK.items()) / 1_000_000
+
+
+class SummaryBudget:
+    """
+    Tracks Claude token usage per run and per account and enforces limits
+
+    Calls reserve their estimated tokens before being sent (so parallel
+    link workers cannot overshoot together) and the reservation is
+    replaced with the real usage reported by the API afterwards.
+    """
+
+    def __init__(self, max_input_tokens: Optional[int] = None,
+                 max_output_tokens: Optional[int] = None,
+                 max_input_tokens_per_account: Optional[int] = None):
+        self.max_input_tokens = max_input_tokens
+        self.max_output_tokens = max_output_tokens
+        self.max_input_tokens_per_account = max_input_tokens_per_account
+
+        self.totals = _empty_usage()
+        self.per_account = {}
+        self._reserved_input = 0
+        self._reserved_output = 0
+        self._reserved_by_account = {}
+        self._lock = threading.Lock()
+
+    def _account(self, account: Optional[str]) -> Dict:
+        return self.per_account.setdefault(account or '_', _empty_usage())
+
+    @staticmethod
+    def _input_used(usage: Dict) -> int:
+        return usage['input_tokens'] + usage['cache_creation_input_tokens'] + usage['cache_read_input_tokens']
+
+    def try_reserve(self, account: Optional[str], input_tokens: int, output_tokens: int) -> bool:
+        """
+        Reserve tokens for one call
+
+        Returns:
+            False (and counts the call as skipped) if it would exceed a limit
+        """
+        with self._lock:
+            account_usage = self._account(account)
+            account_reserved = self._reserved_by_account.get(account, 0)
+
+            over_input = (self.max_input_tokens is not None and
+                          self._input_used(self.totals) + self._reserved_input + input_tokens > self.max_input_tokens)
+            over_output = (self.max_output_tokens is not None and
+                           self.totals['output_tokens'] + self._reserved_output + output_tokens > self.max_output_tokens)
+            over_account = (self.max_input_tokens_per_account is not None and
+                            self._input_used(account_usage) + account_reserved + input_tokens
+                            > self.max_input_tokens_per_account)
+
+            if over_input or over_output or over_account:
+                self.totals['skipped'] += 1
+                account_usage['skipped'] += 1
+                return False
+
+            self._reserved_input += input_tokens
+            self._reserved_output += output_tokens
+            self._reserved_by_account[account] = account_reserved + input_tokens
+            return True
+
+    def record(self, account: Optional[str], reserved_input: int, reserved_output: int, usage=None):
+        """Replace a reservation with the usage reported by the API (None = call failed)"""
+        with self._lock:
+            self._reserved_input -= reserved_input
+            self._reserved_output -= reserved_output
+            self._reserved_by_account[account] = self._reserved_by_account.get(account, 0) - reserved_input
+
+            if usage is None:
+                return
+
+            account_usage = self._account(account)
+            for target in (self.totals, account_usage):
+                target['calls'] += 1
+                for field in USAGE_FIELDS:
+                    target[field] += getattr(usage, field, None) or 0
+
+    def summary(self) -> Dict:
+        """Totals and per-account usage with estimated cost in USD"""
+        with self._lock:
+            return {
+                **self.totals,
+                'estimated_cost_usd': round(_cost(self.totals), 6),
+                'per_account': {
+                    account: {**usage, 'estimated_cost_usd': round(_cost(usage), 6)}
+                    for account, usage in self.per_account.items()
+                }
+            }
+
+
+def merge_usage(summaries: List[Dict]) -> Dict:
+    """Combine SummaryBudget.summary() results (e.g. from worker processes)"""
+    totals = _empty_usage()
+    per_account = {}
+
+    for summary in summaries:
+        for field in totals:
+            totals[field] += summary.get(field, 0)
+        for account, usage in summary.get('per_account', {}).items():
+            target = per_account.setdefault(account, _empty_usage())
+            for field in target:
+                target[field] += usage.get(field, 0)
+
+    return {
+        **totals,
+        'estimated_cost_usd': round(_cost(totals), 6),
+        'per_account': {
+            account: {**usage, 'estimated_cost_usd': round(_cost(usage), 6)}
+            for account, usage in per_account.items()
+        }
+    }
@@ -0,0 +1,110 @@
+"""
+Thread Assembly - groups an author's self-replies into thread trees
+"""
+from typing import Callable, Dict, List, Optional
+
+from tweet_fields import tweet_id_value
+
+# Levels of missing ancestors fetched (one batched lookup per level)
+MAX_ANCESTOR_ROUNDS = 5
+
+
+def _author(tweet: Dict) -> str:
+    return (tweet.get('author') or {}).get('userName', '').lower()
+
+
+def _self_parent_id(tweet: Dict) -> Optional[str]:
+    """Id of the tweet this one replies to, if the author replied to themselves"""
+    parent_id = tweet.get('in_reply_to_id')
+    if not parent_id:
+        return None
+    if (tweet.get('in_reply_to_username') or '').lower() != _author(tweet):
+        return None
+    return parent_id
+
+
+def assemble_threads(tweets: List[Dict],
+                     fetch_tweets: Optional[Callable[[List[str]], List[Dict]]] = None,
+                     max_rounds: int = MAX_ANCESTOR_ROUNDS) -> List[Dict]:
+    """
+    Build thread trees from in-reply-to ids
+
+    A thread is a chain (or tree) of tweets where the author replies to
+    their own tweets. Tweets in a thread get is_thread=True and thread_id
+    (the id of the first tweet of the thread).
+
+    Args:
+        tweets: Cleaned tweets (modified in place)
+        fetch_tweets: Optional batch lookup used to fetch thread ancestors that
+            are not among `tweets` - called once per ancestor level
+        max_rounds: Maximum number of ancestor levels to fetch
+
+    Returns:
+        List of threads, newest first, each with a nested tree of tweets
+    """
+    # id -> tweet index in a single pass
+    index = {t['id']: t for t in tweets if t.get('id')}
+    fetched_ids = set()
+
+    # Fetch missing self-reply ancestors, one batched lookup per level
+    pending = {p for p in map(_self_parent_id, index.values()) if p and p not in index}
+    rounds = 0
+    while pending and fetch_tweets and rounds < max_rounds:
+        rounds += 1
+        new_tweets = [t for t in fetch_tweets(sorted(pending)) if t.get('id') and t['id'] not in index]
+        for tweet in new_tweets:
+            index[tweet['id']] = tweet
+            fetched_ids.add(tweet['id'])
+
+        pending = {p for p in map(_self_parent_id, new_tweets) if p and p not in index}
+
+    # parent id -> child ids (self-replies only)
+    children = {}
+    for tweet_id, tweet in index.items():
+        parent_id = _self_parent_id(tweet)
+        if parent_id in index:
+            children.setdefault(parent_id, []).append(tweet_id)
+
+    roots = [
+        tweet_id for tweet_id, tweet in index.items()
+        if tweet_id in children and _self_parent_id(tweet) not in index
+    ]
+
+    threads = []
+    for root_id in roots:
+        # Iterative walk - long threads would hit the recursion limit
+        nodes = {}
+        stack = [root_id]
+        while stack:
+            tweet_id = stack.pop()
+            tweet = index[tweet_id]
+            tweet['is_thread'] = True
+            tweet['thread_id'] = root_id
+            nodes[tweet_id] = {
+                'id': tweet_id,
+                'text': tweet.get('text', ''),
+                'created_at': tweet.get('created_at', ''),
+                'tweet_url': tweet.get('tweet_url'),
+                'fetched_ancestor': tweet_id in fetched_ids,
+                'children': []
+            }
+            stack.extend(children.get(tweet_id, []))
+
+        for tweet_id, node in nodes.items():
+            parent_id = _self_parent_id(index[tweet_id])
+            if tweet_id != root_id and parent_id in nodes:
+                nodes[parent_id]['children'].append(node)
+
+        for node in nodes.values():
+            node['children'].sort(key=lambda n: tweet_id_value(n['id']))
+
+        threads.append({
+            'thread_id': root_id,
+            'author': _author(index[root_id]),
+            'tweet_count': len(nodes),
+            'tree': nodes[root_id]
+        })
+
+    threads.sort(key=lambda t: tweet_id_value(t['thread_id']), reverse=True)
+    return threads
+
@@ -0,0 +1,284 @@
+"""
+Trending Links - cross-account link aggregation over sliding time windows
+
+Shares of canonical URLs and domains are counted per hour bucket with
+bounded-memory sketches (Space-Saving heavy hitters + Count-Min), so
+"top shared links in the last 24h" merges at most 24 small summaries no
+matter how many tweets were ingested. Re-fetched tweets are skipped with
+the tweet id ranges already counted per account and bucket, not a set of ids.
+"""
+import hashlib
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from tweet_fields import parse_created_at, tweet_id_value
+
+STATE_PATH = Path(__file__).parent.parent / 'exports' / 'trending_state.json'
+
+BUCKET_SECONDS = 3600       # 1 hour buckets
+RETENTION_BUCKETS = 7 * 24  # keep one week of buckets
+
+HEAVY_HITTERS_SIZE = 200    # counters per bucket (Space-Saving)
+MAX_ACCOUNTS_PER_LINK = 50  # accounts remembered per counter
+
+CMS_WIDTH = 512
+CMS_DEPTH = 4
+
+# Query parameters that only track the click, not the content
+TRACKING_PARAMS = {'fbclid', 'gclid', 'igshid', 'mc_cid', 'mc_eid', 'ref', 'ref_src', 'cmpid', 'smid'}
+
+
+def canonical_url(url: str) -> str:
+    """Normalize a URL so different share links of the same article count together"""
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parsed.port and parsed.port not in (80, 443):
+        host = f"{host}:{parsed.port}"
+
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+        if not k.lower().startswith('utm_') and k.lower() not in TRACKING_PARAMS
+    )
+    path = parsed.path.rstrip('/') or '/'
+
+    return urlunparse(('https', host, path, '', urlencode(query), ''))
+
+
+def url_domain(url: str) -> str:
+    return urlparse(url).hostname or ''
+
+
+def _in_ranges(ranges: List[List[int]], value: int) -> bool:
+    return any(lo <= value <= hi for lo, hi in ranges)
+
+
+def _merge_range(ranges: List[List[int]], lo: int, hi: int) -> List[List[int]]:
+    """Add [lo, hi] to sorted, non-overlapping id ranges"""
+    merged = []
+    for start, end in sorted(ranges + [[lo, hi]]):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy hitters: keeps the `size` most frequent keys.
+
+    Counts are overestimated by at most `error` for keys that replaced an
+    evicted one. Each counter also remembers which accounts shared the key.
+    """
+
+    def __init__(self, size: int = HEAVY_HITTERS_SIZE):
+        self.size = size
+        self.counters = {}  # key -> [count, error, accounts]
+
+    def add(self, key: str, account: str, count: int = 1):
+        counter = self.counters.get(key)
+        if counter is None:
+            if len(self.counters) < self.size:
+                counter = self.counters[key] = [0, 0, []]
+            else:
+                # Replace the smallest counter, inheriting its count as error
+                min_key = min(self.counters, key=lambda k: self.counters[k][0])
+                min_count = self.counters.pop(min_key)[0]
+                counter = self.counters[key] = [min_count, min_count, []]
+
+        counter[0] += count
+        if account not in counter[2] and len(counter[2]) < MAX_ACCOUNTS_PER_LINK:
+            counter[2].append(account)
+
+    def to_dict(self) -> Dict:
+        return {'size': self.size, 'counters': self.counters}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'SpaceSaving':
+        sketch = cls(data['size'])
+        sketch.counters = data['counters']
+        return sketch
+
+
+class CountMinSketch:
+    """Count-Min sketch for approximate share counts of any URL"""
+
+    def __init__(self, width: int = CMS_WIDTH, depth: int = CMS_DEPTH, table: Optional[List[List[int]]] = None):
+        self.width = width
+        self.depth = depth
+        self.table = table or [[0] * width for _ in range(depth)]
+
+    def _positions(self, key: str):
+        # Stable across processes (unlike hash()), so the state can be saved
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=4 * self.depth).digest()
+        for row in range(self.depth):
+            yield row, int.from_bytes(digest[4 * row:4 * row + 4], 'little') % self.width
+
+    def add(self, key: str, count: int = 1):
+        for row, col in self._positions(key):
+            self.table[row][col] += count
+
+    def estimate(self, key: str) -> int:
+        return min(self.table[row][col] for row, col in self._positions(key))
+
+    def to_dict(self) -> Dict:
+        return {'width': self.width, 'depth': self.depth, 'table': self.table}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'CountMinSketch':
+        return cls(data['width'], data['depth'], data['table'])
+
+
+class LinkTrends:
+    """Per-hour link and domain sketches over a sliding window"""
+
+    def __init__(self, state_path: Path = STATE_PATH):
+        self.state_path = state_path
+        self.buckets = {}  # bucket start (epoch seconds) -> bucket dict
+
+    @classmethod
+    def load(cls, state_path: Path = STATE_PATH) -> 'LinkTrends':
+        trends = cls(state_path)
+        if state_path.exists():
+            try:
+                with open(state_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                for start, bucket in data.get('buckets', {}).items():
+                    trends.buckets[int(start)] = {
+                        'links': SpaceSaving.from_dict(bucket['links']),
+                        'domains': SpaceSaving.from_dict(bucket['domains']),
+                        'cms': CountMinSketch.from_dict(bucket['cms']),
+                        # Older states kept a newest-id watermark (everything below
+                        # it counted) or a 'seen' id set, which is dropped
+                        'counted': bucket['counted'] if 'counted' in bucket else {
+                            username: [[0, latest]] for username, latest in bucket.get('latest', {}).items()
+                        }
+                    }
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Warning: could not read trending state: {e}")
+        return trends
+
+    def save(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        data = {'buckets': {
+            str(start): {
+                'links': bucket['links'].to_dict(),
+                'domains': bucket['domains'].to_dict(),
+                'cms': bucket['cms'].to_dict(),
+                'counted': bucket['counted']
+            } for start, bucket in self.buckets.items()
+        }}
+        tmp_path = self.state_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        tmp_path.replace(self.state_path)
+
+    def _bucket(self, start: int) -> Dict:
+        if start not in self.buckets:
+            self.buckets[start] = {
+                'links': SpaceSaving(),
+                'domains': SpaceSaving(),
+                'cms': CountMinSketch(),
+                # username -> [[lowest id, highest id], ...] counted, so re-fetched
+                # tweets are not counted twice
+                'counted': {}
+            }
+        return self.buckets[start]
+
+    def _expire(self, now: float):
+        oldest = int(now // BUCKET_SECONDS - RETENTION_BUCKETS + 1) * BUCKET_SECONDS
+        for start in [s for s in self.buckets if s < oldest]:
+            del self.buckets[start]
+
+    def add_tweets(self, username: str, tweets: List[Dict]) -> int:
+        """
+        Count the links of tweets, bucketed by tweet creation time
+
+        A tweet is counted only if its id is outside the id ranges already
+        counted for the account in its bucket. Each call covers a contiguous
+        stretch of the timeline, so the ids between its lowest and highest
+        tweet in a bucket are all seen - a later, deeper fetch still counts
+        the older tweets an earlier, shallower one never reached.
+
+        Returns:
+            Number of links counted (already counted tweets are skipped)
+        """
+        now = datetime.now(timezone.utc).timestamp()
+        oldest = now - RETENTION_BUCKETS * BUCKET_SECONDS
+        counted = 0
+        # Ranges are compared before this call's tweets extend them
+        new_ranges = {}
+        seen_now = set()
+
+        for tweet in tweets:
+            links = tweet.get('extracted_links', [])
+            created = parse_created_at(tweet.get('created_at', ''))
+            tweet_value = tweet_id_value(tweet.get('id'))
+            if not links or not created or not tweet_value or tweet_value in seen_now:
+                continue
+
+            ts = created.timestamp()
+            if ts < oldest:
+                continue
+
+            start = int(ts // BUCKET_SECONDS) * BUCKET_SECONDS
+            bucket = self._bucket(start)
+            # Already counted tweets still belong to this call's stretch of ids
+            lo, hi = new_ranges.get(start, (tweet_value, tweet_value))
+            new_ranges[start] = (min(lo, tweet_value), max(hi, tweet_value))
+            if _in_ranges(bucket['counted'].get(username, []), tweet_value):
+                continue
+            seen_now.add(tweet_value)
+
+            for url in dict.fromkeys(canonical_url(link) for link in links):
+                bucket['links'].add(url, username)
+                bucket['domains'].add(url_domain(url), username)
+                bucket['cms'].add(url)
+                counted += 1
+
+        for start, (lo, hi) in new_ranges.items():
+            counted_ranges = self.buckets[start]['counted']
+            counted_ranges[username] = _merge_range(counted_ranges.get(username, []), lo, hi)
+
+        self._expire(now)
+        return counted
+
+    def _window(self, hours: int) -> List[Dict]:
+        now = datetime.now(timezone.utc).timestamp()
+        first = int(now // BUCKET_SECONDS - hours + 1) * BUCKET_SECONDS
+        return [bucket for start, bucket in self.buckets.items() if start >= first]
+
+    def _top(self, kind: str, hours: int, limit: int) -> List[Dict]:
+        merged = {}
+        for bucket in self._window(hours):
+            for key, (count, error, accounts) in bucket[kind].counters.items():
+                entry = merged.setdefault(key, [0, 0, []])
+                entry[0] += count
+                entry[1] += error
+                entry[2].extend(a for a in accounts if a not in entry[2])
+
+        top = sorted(merged.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+        return [{
+            'key': key,
+            'count': count,
+            'max_error': error,
+            'accounts': accounts
+        } for key, (count, error, accounts) in top]
+
+    def top_links(self, hours: int = 24, limit: int = 10) -> List[Dict]:
+        """Most shared canonical URLs in the last `hours` hours"""
+        return [{'url': e.pop('key'), **e} for e in self._top('links', hours, limit)]
+
+    def top_domains(self, hours: int = 24, limit: int = 10) -> List[Dict]:
+        """Most shared domains in the last `hours` hours"""
+        return [{'domain': e.pop('key'), **e} for e in self._top('domains', hours, limit)]
+
+    def estimate_shares(self, url: str, hours: int = 24) -> int:
+        """Approximate share count of any URL (not only heavy hitters)"""
+        key = canonical_url(url)
+        return sum(bucket['cms'].estimate(key) for bucket in self._window(hours))
@@ -0,0 +1,33 @@
+"""
+Tweet Fields - parsing helpers for raw tweet values, shared by the client,
+thread assembly, scheduler, store and trends
+"""
+from datetime import datetime
+from typing import Optional
+
+# twitterapi.io returns createdAt in the classic Twitter format
+TWITTER_DATE_FORMAT = '%a %b %d %H:%M:%S %z %Y'
+
+
+def parse_created_at(value: str) -> Optional[datetime]:
+    """Parse a tweet created_at string (Twitter or ISO format) into an aware datetime"""
+    if not value:
+        return None
+
+    try:
+        return datetime.strptime(value, TWITTER_DATE_FORMAT)
+    except ValueError:
+        pass
+
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+def tweet_id_value(tweet_id: Optional[str]) -> int:
+    """Numeric value of a tweet id (snowflake ids grow with time), 0 if invalid"""
+    try:
+        return int(tweet_id)
+    except (TypeError, ValueError):
+        return 0
@@ -0,0 +1,443 @@
+"""
+Tweet Store - SQLite index over fetched tweets and analyzed links
+Full-text search (FTS5) over tweet text, link titles and AI summaries,
+plus per-account daily rollups for dashboards
+"""
+import json
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from tweet_fields import parse_created_at
+
+DB_PATH = Path(__file__).parent.parent / 'exports' / 'tweets.db'
+
+# Tweet metrics summed and maxed in the daily rollups
+ROLLUP_METRICS = [
+    'like_count',
+    'retweet_count',
+    'reply_count',
+    'quote_count',
+    'bookmark_count',
+    'view_count',
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tweets (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    username TEXT NOT NULL,
+    text TEXT,
+    created_at TEXT,
+    created_ts REAL,
+    day TEXT,
+    tweet_url TEXT,
+    metrics TEXT,
+    fetched_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tweets_username_ts ON tweets(username, created_ts);
+CREATE INDEX IF NOT EXISTS idx_tweets_ts ON tweets(created_ts);
+CREATE INDEX IF NOT EXISTS idx_tweets_day ON tweets(day);
+CREATE INDEX IF NOT EXISTS idx_tweets_username_day ON tweets(username, day);
+
+CREATE TABLE IF NOT EXISTS links (
+    tweet_id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    domain TEXT,
+    title TEXT,
+    summary TEXT,
+    ai_summary TEXT,
+    status TEXT,
+    day TEXT,
+    PRIMARY KEY (tweet_id, url)
+);
+CREATE INDEX IF NOT EXISTS idx_links_domain_day ON links(domain, day);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS tweets_fts USING fts5(
+    text, title, ai_summary,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+
+CREATE TABLE IF NOT EXISTS account_daily (
+    username TEXT NOT NULL,
+    day TEXT NOT NULL,
+    tweet_count INTEGER NOT NULL DEFAULT 0,
+    link_count INTEGER NOT NULL DEFAULT 0,
+    sum_like_count INTEGER NOT NULL DEFAULT 0,
+    max_like_count INTEGER NOT NULL DEFAULT 0,
+    sum_retweet_count INTEGER NOT NULL DEFAULT 0,
+    max_retweet_count INTEGER NOT NULL DEFAULT 0,
+    sum_reply_count INTEGER NOT NULL DEFAULT 0,
+    max_reply_count INTEGER NOT NULL DEFAULT 0,
+    sum_quote_count INTEGER NOT NULL DEFAULT 0,
+    max_quote_count INTEGER NOT NULL DEFAULT 0,
+    sum_bookmark_count INTEGER NOT NULL DEFAULT 0,
+    max_bookmark_count INTEGER NOT NULL DEFAULT 0,
+    sum_view_count INTEGER NOT NULL DEFAULT 0,
+    max_view_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (username, day)
+);
+
+CREATE TABLE IF NOT EXISTS account_daily_domains (
+    username TEXT NOT NULL,
+    day TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    link_count INTEGER NOT NULL,
+    PRIMARY KEY (username, day, domain)
+);
+
+CREATE TABLE IF NOT EXISTS account_followers (
+    username TEXT NOT NULL,
+    day TEXT NOT NULL,
+    followers INTEGER,
+    following INTEGER,
+    PRIMARY KEY (username, day)
+);
+"""
+
+
+def link_domain(url: str) -> Optional[str]:
+    """Hostname of a URL without the www. prefix"""
+    host = urlparse(url).hostname
+    if not host:
+        return None
+    return host[4:] if host.startswith('www.') else host
+
+
+def _fts_query(query: str) -> str:
+    """Quote every term so user input cannot break FTS5 query syntax"""
+    terms = [t.replace('"', '""') for t in query.split()]
+    return ' '.join(f'"{t}"' for t in terms if t)
+
+
+class TweetStore:
+    """SQLite store with full-text search over tweets and their links"""
+
+    def __init__(self, db_path: Path = DB_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            if conn.execute('PRAGMA user_version').fetchone()[0] < 2:
+                self._lowercase_usernames(conn)
+                conn.execute('PRAGMA user_version = 2')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _lowercase_usernames(self, conn: sqlite3.Connection):
+        """One-off migration - older databases stored usernames as typed (ElonMusk vs elonmusk)"""
+        conn.execute('UPDATE tweets SET username = lower(username) WHERE username != lower(username)')
+
+        # Rollups of mixed-case names are rebuilt under the lowercase name
+        stale = conn.execute(
+            'SELECT DISTINCT lower(username) AS username, day FROM account_daily WHERE username != lower(username)'
+        ).fetchall()
+        conn.execute('DELETE FROM account_daily WHERE username != lower(username)')
+        conn.execute('DELETE FROM account_daily_domains WHERE username != lower(username)')
+        for row in stale:
+            self._refresh_rollup(conn, row['username'], row['day'])
+
+        conn.execute(
+            """
+            INSERT OR IGNORE INTO account_followers (username, day, followers, following)
+            SELECT lower(username), day, followers, following FROM account_followers
+            WHERE username != lower(username)
+            """
+        )
+        conn.execute('DELETE FROM account_followers WHERE username != lower(username)')
+
+    def add_tweets(self, username: str, tweets: List[Dict], user_info: Optional[Dict] = None) -> int:
+        """
+        Insert or update tweets (and their links) in the index
+
+        Daily rollups are refreshed for the days touched by these tweets only.
+
+        Args:
+            username: Account the tweets were fetched from
+            tweets: Cleaned tweets, optionally with analyzed_links
+            user_info: Optional profile data - stored as today's follower snapshot
+
+        Returns:
+            Number of tweets written
+        """
+        # Twitter usernames are case-insensitive - one account, one set of rows
+        username = username.lower()
+        fetched_at = datetime.now().isoformat()
+        touched_days = set()
+
+        with self._connect() as conn:
+            for tweet in tweets:
+                if not tweet.get('id'):
+                    continue
+                day = self._upsert_tweet(conn, username, tweet, fetched_at)
+                if day:
+                    touched_days.add(day)
+
+            for day in touched_days:
+                self._refresh_rollup(conn, username, day)
+
+            if user_info:
+                self._snapshot_followers(conn, username, user_info)
+
+        return len(tweets)
+
+    def _upsert_tweet(self, conn: sqlite3.Connection, username: str, tweet: Dict, fetched_at: str):
+        created = parse_created_at(tweet.get('created_at', ''))
+        created_ts = created.timestamp() if created else None
+        day = created.astimezone(timezone.utc).date().isoformat() if created else None
+
+        conn.execute(
+            """
+            INSERT INTO tweets (id, username, text, created_at, created_ts, day, tweet_url, metrics, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                text = excluded.text,
+                metrics = excluded.metrics,
+                fetched_at = excluded.fetched_at
+            """,
+            (tweet['id'], username, tweet.get('text', ''), tweet.get('created_at'), created_ts, day,
+             tweet.get('tweet_url'), json.dumps(tweet.get('metrics', {})), fetched_at)
+        )
+        rowid = conn.execute('SELECT rowid FROM tweets WHERE id = ?', (tweet['id'],)).fetchone()[0]
+
+        # Plain extracted URLs first, then analysis results fill in titles and summaries
+        links = [{'url': url} for url in tweet.get('extracted_links', [])]
+        links += tweet.get('analyzed_links', [])
+
+        for link in links:
+            url = link.get('url')
+            if not url:
+                continue
+            conn.execute(
+                """
+                INSERT INTO links (tweet_id, url, domain, title, summary, ai_summary, status, day)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(tweet_id, url) DO UPDATE SET
+                    title = COALESCE(excluded.title, links.title),
+                    summary = COALESCE(excluded.summary, links.summary),
+                    ai_summary = COALESCE(excluded.ai_summary, links.ai_summary),
+                    status = COALESCE(excluded.status, links.status)
+                """,
+                (tweet['id'], url, link_domain(url), link.get('title'), link.get('summary'),
+                 link.get('ai_summary'), link.get('status'), day)
+            )
+
+        # Rebuild the FTS row for this tweet from the current link data
+        link_rows = conn.execute(
+            'SELECT title, ai_summary FROM links WHERE tweet_id = ?', (tweet['id'],)
+        ).fetchall()
+        titles = ' '.join(r['title'] for r in link_rows if r['title'])
+        summaries = ' '.join(r['ai_summary'] for r in link_rows if r['ai_summary'])
+
+        conn.execute('DELETE FROM tweets_fts WHERE rowid = ?', (rowid,))
+        conn.execute(
+            'INSERT INTO tweets_fts (rowid, text, title, ai_summary) VALUES (?, ?, ?, ?)',
+            (rowid, tweet.get('text', ''), titles, summaries)
+        )
+
+        return day
+
+    def _refresh_rollup(self, conn: sqlite3.Connection, username: str, day: str):
+        """Recompute one account/day rollup from that day's tweets (indexed, no full scan)"""
+        metric_columns = ', '.join(f'sum_{m}, max_{m}' for m in ROLLUP_METRICS)
+        metric_values = ', '.join(
+            f"COALESCE(SUM(json_extract(metrics, '$.{m}')), 0), "
+            f"COALESCE(MAX(json_extract(metrics, '$.{m}')), 0)"
+            for m in ROLLUP_METRICS
+        )
+
+        conn.execute(
+            f"""
+            INSERT OR REPLACE INTO account_daily (username, day, tweet_count, link_count, {metric_columns})
+            SELECT ?, ?, COUNT(*),
+                   (SELECT COUNT(*) FROM links l JOIN tweets t2 ON t2.id = l.tweet_id
+                    WHERE t2.username = ? AND t2.day = ?),
+                   {metric_values}
+            FROM tweets WHERE username = ? AND day = ?
+            """,
+            (username, day, username, day, username, day)
+        )
+
+        conn.execute('DELETE FROM account_daily_domains WHERE username = ? AND day = ?', (username, day))
+        conn.execute(
+            """
+            INSERT INTO account_daily_domains (username, day, domain, link_count)
+            SELECT t.username, t.day, l.domain, COUNT(*)
+            FROM tweets t JOIN links l ON l.tweet_id = t.id
+            WHERE t.username = ? AND t.day = ? AND l.domain IS NOT NULL
+            GROUP BY l.domain
+            """,
+            (username, day)
+        )
+
+    def _snapshot_followers(self, conn: sqlite3.Connection, username: str, user_info: Dict):
+        today = datetime.now(timezone.utc).date().isoformat()
+        conn.execute(
+            'INSERT OR REPLACE INTO account_followers (username, day, followers, following) VALUES (?, ?, ?, ?)',
+            (username, today,
+             user_info.get('followersCount', user_info.get('followers')),
+             user_info.get('followingCount', user_info.get('following')))
+        )
+
+    def account_timeseries(self, username: str, date_from: Optional[str] = None,
+                           date_to: Optional[str] = None) -> List[Dict]:
+        """
+        Daily activity of an account, read from the rollup tables
+
+        Args:
+            username: Twitter username (case-insensitive)
+            date_from: First day to include (YYYY-MM-DD, UTC)
+            date_to: Last day to include (YYYY-MM-DD, UTC)
+
+        Returns:
+            One dict per day (oldest first) with tweet/link counts, summed and max
+            metrics, links per domain and the follower snapshot of that day
+            (None when there is none)
+        """
+        where = 'username = ? AND day >= ? AND day <= ?'
+        params = (username.lower(), date_from or '0000-00-00', date_to or '9999-99-99')
+
+        days = {}
+        with self._connect() as conn:
+            for row in conn.execute(f'SELECT * FROM account_daily WHERE {where}', params):
+                entry = dict(row)
+                del entry['username']
+                entry['domains'] = {}
+                entry['followers'] = None
+                entry['following'] = None
+                days[row['day']] = entry
+
+            for row in conn.execute(f'SELECT day, domain, link_count FROM account_daily_domains WHERE {where}', params):
+                days[row['day']]['domains'][row['domain']] = row['link_count']
+
+            for row in conn.execute(f'SELECT day, followers, following FROM account_followers WHERE {where}', params):
+                entry = days.get(row['day'])
+                if entry is None:
+                    # Follower snapshot without tweets - same shape as a rollup day
+                    entry = days[row['day']] = {'day': row['day'], 'tweet_count': 0, 'link_count': 0, 'domains': {}}
+                    for m in ROLLUP_METRICS:
+                        entry[f'sum_{m}'] = 0
+                        entry[f'max_{m}'] = 0
+                entry['followers'] = row['followers']
+                entry['following'] = row['following']
+
+        return [days[day] for day in sorted(days)]
+
+    def search(self, query: Optional[str] = None, username: Optional[str] = None,
+               domain: Optional[str] = None, date_from: Optional[str] = None,
+               date_to: Optional[str] = None, page: int = 1, page_size: int = 20) -> Dict:
+        """
+        Search stored tweets
+
+        Args:
+            query: Full-text query over tweet text, link titles and AI summaries
+            username: Only tweets fetched from this account (case-insensitive)
+            domain: Only tweets linking to this domain (e.g. "reuters.com")
+            date_from: First day to include (YYYY-MM-DD, UTC)
+            date_to: Last day to include (YYYY-MM-DD, UTC)
+            page: Page number (1-based)
+            page_size: Results per page
+
+        Returns:
+            Dict with total count, paging info and matching tweets
+        """
+        joins = []
+        where = []
+        params = []
+
+        if query and _fts_query(query):
+            joins.append('JOIN tweets_fts ON tweets_fts.rowid = t.rowid')
+            where.append('tweets_fts MATCH ?')
+            params.append(_fts_query(query))
+            order = 'tweets_fts.rank'
+            snippet = "snippet(tweets_fts, 0, '[', ']', '...', 16)"
+        else:
+            order = 't.created_ts DESC'
+            snippet = 'NULL'
+
+        if username:
+            where.append('t.username = ?')
+            params.append(username.lower())
+        if domain:
+            domain = domain.lower()
+            where.append('t.id IN (SELECT tweet_id FROM links WHERE domain = ?)')
+            params.append(domain[4:] if domain.startswith('www.') else domain)
+        if date_from:
+            where.append('t.day >= ?')
+            params.append(date_from)
+        if date_to:
+            where.append('t.day <= ?')
+            params.append(date_to)
+
+        base = f"FROM tweets t {' '.join(joins)}"
+        if where:
+            base += ' WHERE ' + ' AND '.join(where)
+
+        offset = (page - 1) * page_size
+
+        with self._connect() as conn:
+            total = conn.execute(f'SELECT COUNT(*) {base}', params).fetchone()[0]
+
+            # Sort narrow (rowid, snippet) pairs first, then load only the page of full rows
+            keys = conn.execute(
+                f'SELECT t.rowid AS rid, {snippet} AS snippet {base} ORDER BY {order} LIMIT ? OFFSET ?',
+                params + [page_size, offset]
+            ).fetchall()
+            snippets = {k['rid']: k['snippet'] for k in keys}
+
+            rows = []
+            if keys:
+                placeholders = ','.join('?' * len(keys))
+                by_rowid = {
+                    r['rowid']: r for r in conn.execute(
+                        f'SELECT rowid, * FROM tweets WHERE rowid IN ({placeholders})', list(snippets)
+                    )
+                }
+                rows = [by_rowid[k['rid']] for k in keys]
+
+            tweet_ids = [r['id'] for r in rows]
+            links_by_tweet = {}
+            if tweet_ids:
+                placeholders = ','.join('?' * len(tweet_ids))
+                for link in conn.execute(
+                    f'SELECT * FROM links WHERE tweet_id IN ({placeholders})', tweet_ids
+                ):
+                    links_by_tweet.setdefault(link['tweet_id'], []).append({
+                        'url': link['url'],
+                        'domain': link['domain'],
+                        'title': link['title'],
+                        'summary': link['summary'],
+                        'ai_summary': link['ai_summary'],
+                        'status': link['status']
+                    })
+
+        results = [{
+            'id': r['id'],
+            'username': r['username'],
+            'text': r['text'],
+            'created_at': r['created_at'],
+            'tweet_url': r['tweet_url'],
+            'metrics': json.loads(r['metrics'] or '{}'),
+            'links': links_by_tweet.get(r['id'], []),
+            'snippet': snippets[r['rowid']]
+        } for r in rows]
+
+        return {
+            'total': total,
+            'page': page,
+            'page_size': page_size,
+            'results': results
+        }
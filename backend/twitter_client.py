@@ -2,34 +2,84 @@
 Twitter API Client using twitterapi.io
 """
 import requests
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterator, List, Optional
 import os
+import threading
 from dotenv import load_dotenv
 from pathlib import Path
 
+from threads import assemble_threads
+from link_extract import LinkExtractor
+from profiling import span
+
 # Load .env from parent directory
 env_path = Path(__file__).parent.parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
+# Tweets per /twitter/tweets lookup request
+TWEET_LOOKUP_BATCH = 50
+
+# Tweets kept in the per-client lookup cache
+TWEET_CACHE_SIZE = 10000
+
+class TwitterAPIError(Exception):
+    """Error response from twitterapi.io while paging"""
+
+    def __init__(self, message: str, details: Optional[str] = None):
+        super().__init__(message)
+        self.details = details
+
 
 class TwitterAPIClient:
     """Client for twitterapi.io API"""
 
-    def __init__(self):
+    def __init__(self, rate_limiter=None):
+        """
+        Args:
+            rate_limiter: Optional object with an acquire() method, called before
+                every API request (e.g. FileRateLimiter shared by worker processes)
+        """
+        self.rate_limiter = rate_limiter
         self.api_key = os.getenv('TWITTERAPI_IO_KEY')
         self.base_url = "https://api.twitterapi.io"
 
         if not self.api_key:
             raise ValueError("TWITTERAPI_IO_KEY not found in environment")
 
+        # Reuse connections (keep-alive) across requests
+        self.session = requests.Session()
+
+        # id -> cleaned tweet, for get_tweets_by_ids
+        self._tweet_cache = {}
+
+        self.link_extractor = LinkExtractor.from_env()
+
+        # API requests made by each thread (get_user_tweets reports its own share)
+        self._local = threading.local()
+
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
+
+    def requests_made(self) -> int:
+        """API requests made by this client in the calling thread"""
+        return getattr(self._local, 'requests', 0)
+
+    def _get(self, url: str, params: Dict) -> requests.Response:
+        self._local.requests = self.requests_made() + 1
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        headers = {"x-api-key": self.api_key}
+        with span("twitter_api"):
+            return self.session.get(url, headers=headers, params=params, timeout=15, verify=False)
+
     def get_user_info(self, username: str) -> Optional[Dict]:
         """Get user information"""
         url = f"{self.base_url}/twitter/user/info"
-        headers = {"x-api-key": self.api_key}
         params = {"userName": username}
 
         try:
-            response = requests.get(url, headers=headers, params=params, timeout=15, verify=False)
+            response = self._get(url, params)
 
             if response.status_code == 200:
                 data = response.json()
@@ -44,150 +94,219 @@ class TwitterAPIClient:
             print(f"Exception getting user info: {e}")
             return None
 
-    def get_user_tweets(self, username: str, max_results: int = 50) -> Dict:
+    def get_user_tweets(self, username: str, max_results: int = 50,
+                        on_page: Optional[Callable[[List[Dict]], None]] = None) -> Dict:
         """
         Get latest tweets from a user
 
         Args:
             username: Twitter username (without @)
             max_results: Number of tweets to fetch (default 50)
+            on_page: Optional callback called with the cleaned tweets of each page
+                as it arrives (for incremental rendering)
 
         Returns:
-            Dict with user info and tweets
+            Dict with user info and tweets, and api_requests - the API requests
+            this call made, thread ancestor lookups included
         """
+        requests_before = self.requests_made()
+
         # Get user info first
         user_info = self.get_user_info(username)
         if not user_info:
             return {
                 "success": False,
                 "error": "User not found or API error",
-                "username": username
+                "username": username,
+                "api_requests": self.requests_made() - requests_before
             }
 
         # Get tweets - twitterapi.io returns ~20 tweets per request
-        url = f"{self.base_url}/twitter/user/last_tweets"
-        headers = {"x-api-key": self.api_key}
-
         all_tweets = []
-        cursor = None
-        requests_made = 0
         max_requests = (max_results // 20) + 1  # Calculate needed requests
 
         print(f"[INFO] Fetching up to {max_results} tweets (estimated {max_requests} API requests needed)")
 
         try:
-            while len(all_tweets) < max_results and requests_made < max_requests:
-                params = {"userName": username}
-                if cursor:
-                    params['cursor'] = cursor
-
-                response = requests.get(url, headers=headers, params=params, timeout=15, verify=False)
-                requests_made += 1
-
-                if response.status_code == 200:
-                    data = response.json()
-
-                    if data.get('status') == 'success':
-                        tweets_data = data.get('data', {})
-                        tweets = tweets_data.get('tweets', [])
-
-                        print(f"[INFO] Got {len(tweets)} tweets in this batch (total so far: {len(all_tweets)})")
-
-                        # Extract and clean tweet data
-                        for tweet in tweets:
-                            tweet_id = tweet.get('id', '')
-                            author_username = tweet.get('author', {}).get('userName', username)
-
-                            cleaned_tweet = {
-                                'id': tweet_id,
-                                'text': tweet.get('text', ''),
-                                'created_at': tweet.get('createdAt', ''),
-                                'author': tweet.get('author', {}),
-                                'metrics': {
-                                    'retweet_count': tweet.get('retweetCount', 0),
-                                    'reply_count': tweet.get('replyCount', 0),
-                                    'like_count': tweet.get('likeCount', 0),
-                                    'view_count': tweet.get('viewCount', 0),
-                                    'bookmark_count': tweet.get('bookmarkCount', 0),
-                                    'quote_count': tweet.get('quoteCount', 0)
-                                },
-                                'extracted_links': self._extract_links(tweet),
-                                'tweet_url': f"https://twitter.com/{author_username}/status/{tweet_id}" if tweet_id else None,
-                                'is_thread': tweet.get('replyCount', 0) > 0  # Likely has replies (thread)
-                            }
-                            all_tweets.append(cleaned_tweet)
-
-                        # Check for next cursor (pagination) - cursor is at root level, not in data
-                        has_next_page = data.get('has_next_page', False)
-                        cursor = data.get('next_cursor') if has_next_page else None
-
-                        if not cursor or not tweets:
-                            break
-
-                    else:
-                        error_msg = data.get('msg', 'Unknown API error')
-                        return {
-                            "success": False,
-                            "error": error_msg,
-                            "username": username
-                        }
-
-                elif response.status_code == 429:
-                    return {
-                        "success": False,
-                        "error": "Rate limit exceeded. Please try again later.",
-                        "username": username
-                    }
-
-                else:
-                    return {
-                        "success": False,
-                        "error": f"API error: {response.status_code}",
-                        "details": response.text,
-                        "username": username
-                    }
+            for page in self.iter_tweet_pages(username, max_results=max_results, max_pages=max_requests):
+                all_tweets.extend(page['tweets'])
+                if on_page and page['tweets']:
+                    on_page(page['tweets'])
 
             # Limit to requested amount
             all_tweets = all_tweets[:max_results]
 
+            # Group self-replies into threads (sets is_thread / thread_id on tweets)
+            threads = assemble_threads(all_tweets, fetch_tweets=self.get_tweets_by_ids)
+
             return {
                 "success": True,
                 "username": username,
                 "user_info": user_info,
                 "total_tweets": len(all_tweets),
-                "tweets": all_tweets
+                "tweets": all_tweets,
+                "threads": threads,
+                "api_requests": self.requests_made() - requests_before
+            }
+
+        except TwitterAPIError as e:
+            error = {
+                "success": False,
+                "error": str(e),
+                "username": username,
+                "api_requests": self.requests_made() - requests_before
             }
+            if e.details:
+                error['details'] = e.details
+            return error
 
         except Exception as e:
             return {
                 "success": False,
                 "error": f"Exception: {str(e)}",
-                "username": username
+                "username": username,
+                "api_requests": self.requests_made() - requests_before
             }
 
-    def _extract_links(self, tweet: Dict) -> List[str]:
-        """Extract URLs from tweet"""
-        links = []
-
-        # Check for URLs in tweet entities
-        entities = tweet.get('entities', {})
-
-        # Extract from urls array
-        if 'urls' in entities:
-            for url_obj in entities['urls']:
-                expanded_url = url_obj.get('expandedURL', '') or url_obj.get('expanded_url', '')
-                # Skip Twitter/X internal links
-                if expanded_url and not any(x in expanded_url.lower() for x in ['twitter.com', 'x.com', 't.co']):
-                    links.append(expanded_url)
-
-        # Also check media if present
-        if 'media' in entities:
-            for media_obj in entities['media']:
-                expanded_url = media_obj.get('expandedURL', '') or media_obj.get('expanded_url', '')
-                if expanded_url and not any(x in expanded_url.lower() for x in ['twitter.com', 'x.com', 't.co', 'pic.twitter.com']):
-                    links.append(expanded_url)
-
-        return links
+    def iter_tweet_pages(self, username: str, max_results: Optional[int] = None,
+                         cursor: Optional[str] = None, max_pages: Optional[int] = None,
+                         on_progress: Optional[Callable[[int, Optional[int]], None]] = None) -> Iterator[Dict]:
+        """
+        Page through a user's tweets, newest first, one API page at a time
+
+        Only the current page is held in memory, so this works for archival
+        pulls of any size. Stop iterating at any point; to resume later, pass
+        the last page's next_cursor as `cursor`.
+
+        Args:
+            username: Twitter username (without @)
+            max_results: Stop after this many tweets (None = until the end)
+            cursor: Cursor to resume from (None = newest tweets)
+            max_pages: Stop after this many API requests (None = no limit)
+            on_progress: Optional callback called with (tweets so far, max_results)
+
+        Yields:
+            Dicts with 'tweets' (cleaned), 'next_cursor' (None on the last page)
+            and 'fetched' (tweets yielded so far, including this page)
+
+        Raises:
+            TwitterAPIError: on API errors (e.g. rate limit)
+        """
+        url = f"{self.base_url}/twitter/user/last_tweets"
+        fetched = 0
+        pages = 0
+
+        while (max_results is None or fetched < max_results) and (max_pages is None or pages < max_pages):
+            params = {"userName": username}
+            if cursor:
+                params['cursor'] = cursor
+
+            response = self._get(url, params)
+            pages += 1
+
+            if response.status_code == 429:
+                raise TwitterAPIError("Rate limit exceeded. Please try again later.")
+            if response.status_code != 200:
+                raise TwitterAPIError(f"API error: {response.status_code}", details=response.text)
+
+            data = response.json()
+            if data.get('status') != 'success':
+                raise TwitterAPIError(data.get('msg', 'Unknown API error'))
+
+            tweets = data.get('data', {}).get('tweets', [])
+            print(f"[INFO] Got {len(tweets)} tweets in this batch (total so far: {fetched})")
+
+            # Extract and clean tweet data
+            page_tweets = self._clean_page(tweets, username)
+            if max_results is not None:
+                page_tweets = page_tweets[:max_results - fetched]
+            fetched += len(page_tweets)
+
+            # Check for next cursor (pagination) - cursor is at root level, not in data
+            has_next_page = data.get('has_next_page', False)
+            cursor = data.get('next_cursor') if has_next_page and tweets else None
+
+            yield {
+                'tweets': page_tweets,
+                'next_cursor': cursor,
+                'fetched': fetched
+            }
+
+            if on_progress:
+                on_progress(fetched, max_results)
+
+            if not cursor:
+                break
+
+    def get_tweets_by_ids(self, tweet_ids: List[str]) -> List[Dict]:
+        """
+        Get tweets by id, in batches of TWEET_LOOKUP_BATCH per request
+
+        Lookups are cached on the client, so ancestors shared by several
+        threads (or seen in an earlier run) are fetched only once.
+
+        Returns:
+            Cleaned tweets that were found (missing/deleted ones are skipped)
+        """
+        found = [self._tweet_cache[i] for i in tweet_ids if i in self._tweet_cache]
+        missing = [i for i in dict.fromkeys(tweet_ids) if i not in self._tweet_cache]
+
+        url = f"{self.base_url}/twitter/tweets"
+
+        for start in range(0, len(missing), TWEET_LOOKUP_BATCH):
+            batch = missing[start:start + TWEET_LOOKUP_BATCH]
+            try:
+                response = self._get(url, {"tweet_ids": ",".join(batch)})
+                if response.status_code != 200:
+                    print(f"Error looking up tweets: {response.status_code}")
+                    continue
+
+                data = response.json()
+                if data.get('status') != 'success':
+                    print(f"Error looking up tweets: {data.get('msg', 'Unknown API error')}")
+                    continue
+
+                for cleaned in self._clean_page(data.get('tweets', [])):
+                    if len(self._tweet_cache) >= TWEET_CACHE_SIZE:
+                        self._tweet_cache.pop(next(iter(self._tweet_cache)))
+                    self._tweet_cache[cleaned['id']] = cleaned
+                    found.append(cleaned)
+
+            except Exception as e:
+                print(f"Exception looking up tweets: {e}")
+
+        return found
+
+    def _clean_page(self, tweets: List[Dict], username: str = '') -> List[Dict]:
+        """Clean a page of raw tweets, extracting links for the whole page at once"""
+        page_links = self.link_extractor.extract_page(tweets)
+        return [self._clean_tweet(tweet, username, links) for tweet, links in zip(tweets, page_links)]
+
+    def _clean_tweet(self, tweet: Dict, username: str = '', links: Optional[List[str]] = None) -> Dict:
+        """Convert a raw twitterapi.io tweet into our tweet format"""
+        tweet_id = tweet.get('id', '')
+        author_username = tweet.get('author', {}).get('userName', username)
+
+        return {
+            'id': tweet_id,
+            'text': tweet.get('text', ''),
+            'created_at': tweet.get('createdAt', ''),
+            'author': tweet.get('author', {}),
+            'metrics': {
+                'retweet_count': tweet.get('retweetCount', 0),
+                'reply_count': tweet.get('replyCount', 0),
+                'like_count': tweet.get('likeCount', 0),
+                'view_count': tweet.get('viewCount', 0),
+                'bookmark_count': tweet.get('bookmarkCount', 0),
+                'quote_count': tweet.get('quoteCount', 0)
+            },
+            'extracted_links': self.link_extractor.extract(tweet) if links is None else links,
+            'tweet_url': f"https://twitter.com/{author_username}/status/{tweet_id}" if tweet_id else None,
+            'conversation_id': tweet.get('conversationId'),
+            'in_reply_to_id': tweet.get('inReplyToId'),
+            'in_reply_to_username': tweet.get('inReplyToUsername'),
+            'is_thread': False  # Set by assemble_threads
+        }
 
 
 # Test function
@@ -8,6 +8,9 @@ import sys
 import os
 from pathlib import Path
 import json
+import copy
+import threading
+import time
 from datetime import datetime
 
 # Add backend to path
@@ -15,6 +18,73 @@ sys.path.insert(0, str(Path(__file__).parent / "backend"))
 
 from twitter_client import TwitterAPIClient
 
+# Fetched results are reused for this many seconds (per username + count)
+FETCH_CACHE_TTL = 600
+
+# Parallel link fetches during link analysis
+LINK_WORKERS = 8
+
+
+class FetchError(Exception):
+    """Raised for failed fetches (they are not cached)"""
+
+
+@st.cache_resource
+def get_twitter_client():
+    return TwitterAPIClient()
+
+
+@st.cache_resource
+def get_link_analyzer():
+    # Imported lazily - only needed when link analysis is enabled
+    from link_analyzer import LinkAnalyzer
+    from link_cache import LinkCache
+    return LinkAnalyzer(cache=LinkCache())
+
+
+@st.cache_resource
+def get_fetch_cache():
+    """(username, max_tweets) -> (fetched_at, result), shared by all sessions"""
+    return {}
+
+
+@st.cache_resource
+def get_fetch_lock():
+    """Guards get_fetch_cache() - Streamlit runs each session in its own thread"""
+    return threading.Lock()
+
+
+def fetch_tweets(username: str, max_tweets: int, on_page=None):
+    """
+    Fetch tweets, reusing results for FETCH_CACHE_TTL seconds (per username + count)
+
+    Not wrapped in st.cache_data - on_page draws Streamlit elements, which
+    st.cache_data would try to replay on a cache hit. On a hit on_page is
+    not called.
+    """
+    cache = get_fetch_cache()
+    key = (username.lower(), max_tweets)
+    now = time.time()
+
+    with get_fetch_lock():
+        cached = cache.get(key)
+    if cached and now - cached[0] < FETCH_CACHE_TTL:
+        return copy.deepcopy(cached[1])
+
+    result = get_twitter_client().get_user_tweets(
+        username=username,
+        max_results=max_tweets,
+        on_page=on_page
+    )
+    if not result['success']:
+        raise FetchError(result.get('error', 'Unknown error'))
+
+    with get_fetch_lock():
+        for expired in [k for k, (fetched_at, _) in cache.items() if now - fetched_at >= FETCH_CACHE_TTL]:
+            del cache[expired]
+        cache[key] = (now, result)
+    return copy.deepcopy(result)
+
 # Page config
 st.set_page_config(
     page_title="Twitter Analyzer",
@@ -45,6 +115,12 @@ with st.sidebar:
         help="How many tweets to fetch"
     )
 
+    analyze_links = st.checkbox(
+        "Analyze links (Claude AI)",
+        value=False,
+        help="Fetch linked articles and summarize them (slower)"
+    )
+
     save_json = st.checkbox(
         "Save to JSON",
         value=False,
@@ -59,37 +135,64 @@ if 'result' not in st.session_state:
 
 # Main content
 if analyze_button and username:
-    with st.spinner(f"Fetching {max_tweets} tweets from @{username}..."):
-        try:
-            # Initialize client
-            client = TwitterAPIClient()
+    # Tweets are shown as pages arrive, then replaced by the full view below
+    live_placeholder = st.empty()
+    live_box = live_placeholder.container()
+    live_status = live_box.empty()
+    live_count = [0]
+
+    def show_page(page_tweets):
+        live_count[0] += len(page_tweets)
+        live_status.caption(f"Fetched {live_count[0]}/{max_tweets} tweets...")
+        for tweet in page_tweets:
+            live_box.markdown(f"- {tweet['text'][:200]}")
+
+    try:
+        with st.spinner(f"Fetching {max_tweets} tweets from @{username}..."):
+            result = fetch_tweets(username, max_tweets, on_page=show_page)
+
+        live_placeholder.empty()
+
+        # Analyze links in a thread pool, with progress
+        if analyze_links and result['tweets']:
+            progress = st.progress(0.0, text="Analyzing links...")
+
+            def show_progress(done, total):
+                progress.progress(done / total, text=f"Analyzing links... {done}/{total}")
+
+            result = dict(result)
+            result['tweets'] = get_link_analyzer().analyze_links(
+                result['tweets'],
+                max_workers=LINK_WORKERS,
+                on_progress=show_progress
+            )
+            progress.empty()
 
-            # Fetch tweets
-            result = client.get_user_tweets(username=username, max_results=max_tweets)
+        st.session_state.result = result
 
-            if result['success']:
-                st.session_state.result = result
+        # Save to JSON if requested
+        if save_json:
+            exports_dir = Path(__file__).parent / 'exports'
+            exports_dir.mkdir(exist_ok=True)
 
-                # Save to JSON if requested
-                if save_json:
-                    exports_dir = Path(__file__).parent / 'exports'
-                    exports_dir.mkdir(exist_ok=True)
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f"{username}_{timestamp}.json"
+            filepath = exports_dir / filename
 
-                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                    filename = f"{username}_{timestamp}.json"
-                    filepath = exports_dir / filename
+            with open(filepath, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
 
-                    with open(filepath, 'w', encoding='utf-8') as f:
-                        json.dump(result, f, ensure_ascii=False, indent=2)
+            st.success(f"✅ Saved to: {filepath}")
 
-                    st.success(f"✅ Saved to: {filepath}")
-            else:
-                st.error(f"❌ Error: {result.get('error', 'Unknown error')}")
-                st.session_state.result = None
+    except FetchError as e:
+        live_placeholder.empty()
+        st.error(f"❌ Error: {e}")
+        st.session_state.result = None
 
-        except Exception as e:
-            st.error(f"❌ Exception: {str(e)}")
-            st.session_state.result = None
+    except Exception as e:
+        live_placeholder.empty()
+        st.error(f"❌ Exception: {str(e)}")
+        st.session_state.result = None
 
 # Display results
 if st.session_state.result:
@@ -151,7 +254,13 @@ if st.session_state.result:
                 st.info("🧵 This tweet is part of a thread")
 
             # Links
-            if tweet.get('extracted_links'):
+            if tweet.get('analyzed_links'):
+                st.markdown("**🔗 External Links:**")
+                for link in tweet['analyzed_links']:
+                    st.markdown(f"- [{link.get('title') or link['url']}]({link['url']})")
+                    if link.get('ai_summary') or link.get('summary'):
+                        st.caption(link.get('ai_summary') or link.get('summary'))
+            elif tweet.get('extracted_links'):
                 st.markdown("**🔗 External Links:**")
                 for link in tweet['extracted_links']:
                     st.markdown(f"- {link}")
@@ -171,6 +280,7 @@ elif not st.session_state.result:
     - ✅ Fetch 5-100 tweets from any public profile
     - ✅ View tweet metrics (likes, retweets, views)
     - ✅ Extract external links
+    - ✅ Summarize linked articles with Claude AI
     - ✅ Identify threads
     - ✅ Save results to JSON
 
@@ -182,9 +292,10 @@ elif not st.session_state.result:
         st.markdown("""
         1. **Enter username** (without @) in the sidebar
         2. **Choose number of tweets** (5-100 with slider)
-        3. **Optional:** Check "Save to JSON" to export results
-        4. Click **"Analyze Profile"** button
-        5. View results below!
+        3. **Optional:** Check "Analyze links" to summarize linked articles
+        4. **Optional:** Check "Save to JSON" to export results
+        5. Click **"Analyze Profile"** button
+        6. View results below!
 
         **Note:** This uses TwitterAPI.io which has rate limits.
         If you hit limits, wait a few minutes and try again.